@@ -0,0 +1,177 @@
+"""Benchmark the validation engine on synthetic fabrics.
+
+    python -m benchmarks.bench_validation --flows 50000 --acl-entries 1000
+    python -m benchmarks.bench_validation --compare <commit or results file>
+
+Each run reports matching throughput (flows x rules per second) for the ACL,
+shutdown and VLAN checks, and the time and peak traced memory of the check
+pipeline on a multi-host run; the fabric YAML and flows it reads are
+generated once, outside the timing. Results are written to
+benchmarks/results/<commit>.json so runs can be compared across commits.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import Future
+
+from config_validator import synthetic
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import (
+    get_shutdown_ports, iter_blocked_flows, iter_shutdown_affected, iter_vlan_impacts, read_interface_data,
+    read_yaml_configs, run_checks,
+)
+from config_validator.report import Report, write_jsonl
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench_checks(args):
+    flows = {'connection_stats': synthetic.generate_flows(args.flows, interfaces=args.interfaces, seed=args.seed)}
+    acls = synthetic.generate_acls(args.acl_entries, seed=args.seed)
+    interfaces = {'h': synthetic.generate_interfaces(args.interfaces, seed=args.seed)}
+    svis = synthetic.generate_svis(args.svis, seed=args.seed)
+    shutdown_ports = get_shutdown_ports('h', interfaces)
+
+    results = {}
+    cases = (
+        ('acl', args.acl_entries, lambda: sum(1 for _ in iter_blocked_flows(acls, flows, args.jobs))),
+        ('shutdown', max(len(shutdown_ports), 1),
+         lambda: sum(1 for _ in iter_shutdown_affected('h', shutdown_ports, flows))),
+        ('vlan', args.svis, lambda: sum(1 for _ in iter_vlan_impacts(svis, flows))),
+    )
+    for name, rules, func in cases:
+        elapsed, impacts = best_of(args.repeat, func)
+        results[name] = {
+            'seconds': elapsed,
+            'impacts': impacts,
+            'flow_rules_per_second': args.flows * rules / elapsed if elapsed else None,
+        }
+    return results
+
+
+def write_inputs(args, directory):
+    """Write the fabric's YAML and generate each host's flows, outside the timed region."""
+    host_vars, structured_config = synthetic.write_fabric(
+        directory, args.hosts, acl_entries=args.acl_entries, interfaces=args.interfaces, svis=args.svis, seed=args.seed,
+    )
+    hosts = sorted(synthetic.hostname(index) for index in range(args.hosts))
+    flows = {
+        host: synthetic.generate_flows(args.flows, interfaces=args.interfaces, seed=args.seed + index)
+        for index, host in enumerate(hosts)
+    }
+    return host_vars, structured_config, flows
+
+
+def run_end_to_end(args, host_vars, structured_config, flows):
+    """Run the check pipeline: load configs, prescreen, check and write the report."""
+    acl_policies = read_yaml_configs(host_vars, 'ip_access_lists')
+    interfaces_data = read_interface_data(structured_config)
+    vlan_configs = read_yaml_configs(structured_config, 'vlan_interfaces')
+    host_flows = {}
+    for host in sorted(set(acl_policies) | set(interfaces_data) | set(vlan_configs)):
+        prescreen = build_prescreen(
+            acl_policies.get(host, []), get_shutdown_ports(host, interfaces_data), vlan_configs.get(host, []),
+        )
+        future = Future()
+        future.set_result({'connection_stats': [flow for flow in flows.get(host, []) if prescreen.may_match(flow)]})
+        host_flows[host] = future
+    report = Report()
+    run_checks(report, acl_policies, interfaces_data, vlan_configs, host_flows, jobs=args.jobs)
+    write_jsonl(report, io.StringIO())
+    return len(report.findings)
+
+
+def bench_end_to_end(args):
+    with tempfile.TemporaryDirectory() as directory:
+        inputs = write_inputs(args, directory)
+        elapsed, findings = best_of(args.repeat, lambda: run_end_to_end(args, *inputs))
+        # The inputs were allocated before tracing starts, so the peak is the pipeline's own.
+        tracemalloc.start()
+        run_end_to_end(args, *inputs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'seconds': elapsed, 'findings': findings, 'peak_memory_bytes': peak}
+
+
+def load_results(reference):
+    path = reference if os.path.exists(reference) else os.path.join(RESULTS_DIR, f"{reference}.json")
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current, baseline):
+    print(f"\nCompared with {baseline['revision']}:")
+    for name, metrics in current['checks'].items():
+        before = baseline['checks'].get(name, {}).get('seconds')
+        if before:
+            print(f"  {name:<10} {before * 1000:9.1f} ms -> {metrics['seconds'] * 1000:9.1f} ms "
+                  f"({before / metrics['seconds']:.2f}x)")
+    before = baseline['end_to_end']
+    after = current['end_to_end']
+    print(f"  {'e2e':<10} {before['seconds'] * 1000:9.1f} ms -> {after['seconds'] * 1000:9.1f} ms "
+          f"({before['seconds'] / after['seconds']:.2f}x)")
+    print(f"  {'memory':<10} {before['peak_memory_bytes'] / 1e6:9.1f} MB -> {after['peak_memory_bytes'] / 1e6:9.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=20000, help="flows per host")
+    parser.add_argument("--acl-entries", type=int, default=500, help="ACL entries per host")
+    parser.add_argument("--interfaces", type=int, default=48, help="Ethernet interfaces per host")
+    parser.add_argument("--svis", type=int, default=16, help="VLAN interfaces per host")
+    parser.add_argument("--hosts", type=int, default=4, help="hosts in the end-to-end run")
+    parser.add_argument("--repeat", type=int, default=3, help="take the best of N runs")
+    parser.add_argument("--jobs", type=int, default=1, help="processes for sharded ACL matching")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", metavar="REF", help="commit or results file to compare against")
+    parser.add_argument("--no-save", action="store_true", help="do not write results to benchmarks/results/")
+    args = parser.parse_args()
+
+    results = {
+        'revision': git_revision(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('compare', 'no_save')},
+        'checks': bench_checks(args),
+        'end_to_end': bench_end_to_end(args),
+    }
+    for name, metrics in results['checks'].items():
+        print(f"{name:<10} {metrics['seconds'] * 1000:9.1f} ms  "
+              f"{metrics['flow_rules_per_second'] or 0:14,.0f} flow-rules/s  {metrics['impacts']} impacts")
+    e2e = results['end_to_end']
+    print(f"{'e2e':<10} {e2e['seconds'] * 1000:9.1f} ms  {e2e['findings']} findings  "
+          f"peak {e2e['peak_memory_bytes'] / 1e6:.1f} MB")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{results['revision']}.json")
+        with open(path, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"\nSaved {path}")
+    if args.compare:
+        compare(results, load_results(args.compare))
+
+
+if __name__ == "__main__":
+    main()
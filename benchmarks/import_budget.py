@@ -0,0 +1,74 @@
+"""Check entry-point import time against a budget using `python -X importtime`.
+
+    python -m benchmarks.import_budget
+
+Fails (exit status 1) when a module's cumulative import time exceeds its
+budget, or when it pulls in a heavy dependency that should load lazily.
+Also reports wall-clock time of `validate-config --help`.
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+# Cumulative import time budgets in milliseconds.
+BUDGETS = {
+    'config_validator.runner': 25,
+    'config_validator.query_check': 50,
+}
+# Modules that must not be imported just by loading the entry points.
+LAZY = ('requests', 'rich', 'yaml', 'grpc', 'cvprac', 'fastapi', 'pkg.clover', 'subprocess')
+HELP_BUDGET_MS = 100
+
+
+def import_times(module):
+    """Return {module: cumulative seconds} for a fresh `import module`."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True,
+    ).stderr
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def best_wall_time(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="take the best of N runs")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS.items():
+        elapsed = min(import_times(module)[module] for _ in range(args.repeat)) * 1000
+        loaded = sorted(name for name in import_times(module) if name in LAZY)
+        print(f"{module:<32} {elapsed:6.1f} ms  (budget {budget} ms)")
+        if elapsed > budget:
+            failures.append(f"{module} imports in {elapsed:.1f} ms, over its {budget} ms budget")
+        if loaded:
+            failures.append(f"{module} eagerly imports {', '.join(loaded)}")
+
+    interpreter = best_wall_time([sys.executable, "-c", "pass"], args.repeat) * 1000
+    help_time = best_wall_time([sys.executable, "-m", "config_validator.runner", "--help"], args.repeat) * 1000
+    print(f"{'validate-config --help':<32} {help_time:6.1f} ms  (bare interpreter {interpreter:.1f} ms)")
+    if help_time > HELP_BUDGET_MS:
+        failures.append(f"--help takes {help_time:.1f} ms, over the {HELP_BUDGET_MS} ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Load-test the API server and report throughput and tail latency.
+
+Against a running server:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --path /leaf1/connection_stats
+
+Or let the driver start a fake Clover server and uvicorn with N workers:
+
+    python -m benchmarks.load_test --spawn --uvicorn-workers 4 --flows 5000 --latency 20 --concurrency 32
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+_local = threading.local()
+
+
+def session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, timeout=60):
+    """Poll /healthz until it answers 200 with status "ok"."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(f"{url}/healthz", timeout=1)
+            if response.status_code == 200 and response.json().get("status") == "ok":
+                return
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"{url} did not start within {timeout}s")
+
+
+def spawn(args, directory):
+    """Start a fake Clover server and uvicorn; return (base URL, processes)."""
+    clover_port = free_port()
+    api_port = free_port()
+    inventory = os.path.join(directory, "inventory.json")
+    clover = subprocess.Popen([
+        sys.executable, "-m", "config_validator.api.fake_clover", "--port", str(clover_port),
+        "--flows", str(args.flows), "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+        "--inventory", inventory,
+    ], stdout=subprocess.PIPE, text=True)
+    clover.stdout.readline()  # blocks until the server is listening
+    env = {
+        **os.environ,
+        "CONFIG_VALIDATOR_CV_SERVER": f"localhost:{clover_port}",
+        "CONFIG_VALIDATOR_CV_INSECURE": "1",
+        "CONFIG_VALIDATOR_INVENTORY": inventory,
+    }
+    api = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "config_validator.api.main:app",
+        "--port", str(api_port), "--workers", str(args.uvicorn_workers), "--log-level", "warning",
+    ], env=env)
+    url = f"http://127.0.0.1:{api_port}"
+    wait_until_ready(url)
+    return url, [api, clover]
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    try:
+        status = session().get(url, timeout=60).status_code
+    except requests.exceptions.RequestException as e:
+        status = type(e).__name__
+    return time.perf_counter() - start, status
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(urls, total, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(timed_get, (urls[index % len(urls)] for index in range(total))))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    statuses = Counter(status for _, status in results)
+    return {
+        'requests': total,
+        'seconds': elapsed,
+        'throughput': total / elapsed,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1],
+        'statuses': dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="endpoint path, may repeat")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="requests sent before measuring")
+    parser.add_argument("--spawn", action="store_true", help="start a fake Clover server and uvicorn")
+    parser.add_argument("--uvicorn-workers", type=int, default=1)
+    parser.add_argument("--flows", type=int, default=1000, help="fake Clover flows per device")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Clover latency per RPC in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake Clover error fraction")
+    args = parser.parse_args()
+    paths = args.paths or ["/leaf1/connection_stats"]
+
+    processes = []
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            url = args.url
+            if args.spawn:
+                url, processes = spawn(args, directory)
+            urls = [f"{url}{path}" for path in paths]
+            if args.warmup:
+                run(urls, args.warmup, args.concurrency)
+            result = run(urls, args.requests, args.concurrency)
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    print(f"{result['requests']} requests, concurrency {args.concurrency}, {result['seconds']:.2f} s")
+    print(f"throughput {result['throughput']:.1f} req/s")
+    print(f"latency ms  p50 {result['p50'] * 1000:.1f}  p95 {result['p95'] * 1000:.1f}  "
+          f"p99 {result['p99'] * 1000:.1f}  max {result['max'] * 1000:.1f}")
+    print("statuses", ", ".join(f"{status}: {count}" for status, count in sorted(result['statuses'].items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
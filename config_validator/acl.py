@@ -0,0 +1,344 @@
+"""First-match ACL evaluation compiled into per-field bit-vector lookups.
+
+Every entry gets one bit, ordered by sequence number. Each match field
+(protocol, source/destination address, source/destination port) is
+partitioned into disjoint regions, and each region maps to the bitmask of
+entries that accept it. Classifying a flow ANDs one mask per field; the
+lowest set bit is the first matching entry.
+"""
+import ipaddress
+import json
+from bisect import bisect_right
+from functools import lru_cache
+
+PROTOCOL_NUMBERS = {'ICMP': 1, 'IGMP': 2, 'TCP': 6, 'UDP': 17, 'GRE': 47, 'ESP': 50, 'AH': 51,
+                    'ICMPV6': 58, 'OSPF': 89, 'PIM': 103, 'VRRP': 112}
+WILDCARDS = ('', 'any', 'ip', 'ipv4', 'ipv6')
+MAX_PORT = 65535
+NAMED_PORTS = {
+    'ftp-data': 20, 'ftp': 21, 'ssh': 22, 'telnet': 23, 'smtp': 25, 'tacacs': 49, 'domain': 53, 'dns': 53,
+    'bootps': 67, 'bootpc': 68, 'tftp': 69, 'www': 80, 'http': 80, 'pop3': 110, 'ntp': 123, 'snmp': 161,
+    'snmptrap': 162, 'bgp': 179, 'ldap': 389, 'https': 443, 'isakmp': 500, 'syslog': 514, 'ldp': 646,
+    'radius': 1812, 'radius-acct': 1813, 'bfd': 3784, 'bfd-echo': 3785, 'gnmi': 6030, 'vxlan': 4789,
+}
+PORT_OPERATORS = ('eq', 'neq', 'gt', 'lt', 'range')
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def parse_protocol(value):
+    """Return a protocol number, or None when the entry matches any protocol."""
+    if value is None:
+        return None
+    text = str(value).strip().upper()
+    if text.lower() in WILDCARDS:
+        return None
+    if text.isdigit():
+        return int(text)
+    if text not in PROTOCOL_NUMBERS:
+        raise ValueError(f"unknown protocol {value!r}")
+    return PROTOCOL_NUMBERS[text]
+
+
+def parse_address(value):
+    """Return an ip_network for an ACL address, or None for `any`."""
+    text = str(value).strip()
+    if text.lower() in WILDCARDS:
+        return None
+    parts = text.split()
+    if parts[0].lower() == 'host':
+        parts = parts[1:]
+    if len(parts) == 2:
+        # Cisco-style wildcard mask, e.g. "10.0.0.0 0.0.0.255".
+        return ipaddress.ip_network(f"{parts[0]}/{parts[1]}", strict=False)
+    return ipaddress.ip_network(parts[0], strict=False)
+
+
+def _port_number(token):
+    token = str(token).strip().lower()
+    if token.isdigit():
+        port = int(token)
+        if port > MAX_PORT:
+            raise ValueError(f"port {port} out of range")
+        return port
+    if token in NAMED_PORTS:
+        return NAMED_PORTS[token]
+    raise ValueError(f"unknown port {token!r}")
+
+
+def _port_range(low, high):
+    if low > high:
+        raise ValueError(f"empty port range {low}-{high}")
+    return [(low, high)]
+
+
+def _apply_operator(operator, ports):
+    if not ports:
+        raise ValueError(f"port operator {operator!r} without a port")
+    if operator in ('gt', 'lt') and len(ports) != 1:
+        raise ValueError(f"port operator {operator!r} takes one port, got {len(ports)}")
+    if operator == 'range' and len(ports) != 2:
+        raise ValueError(f"port operator 'range' takes two ports, got {len(ports)}")
+    if operator == 'eq':
+        return [(port, port) for port in ports]
+    # `gt 65535` and `lt 0` are valid but match no port.
+    if operator == 'gt':
+        return [(ports[0] + 1, MAX_PORT)] if ports[0] < MAX_PORT else []
+    if operator == 'lt':
+        return [(0, ports[0] - 1)] if ports[0] > 0 else []
+    if operator == 'range':
+        return _port_range(ports[0], ports[1])
+    # neq: the complement of every listed port.
+    intervals = []
+    low = 0
+    for port in sorted(set(ports)):
+        if port > low:
+            intervals.append((low, port - 1))
+        low = port + 1
+    if low <= MAX_PORT:
+        intervals.append((low, MAX_PORT))
+    return intervals
+
+
+def parse_port_expression(expression):
+    """Parse one port expression into (low, high) intervals.
+
+    Accepts numbers, service names (`bgp`, `ssh`), `low-high` ranges and
+    operator forms such as `eq 22 443`, `gt 1023`, `neq 80` or `range 1000 2000`.
+    """
+    tokens = str(expression).replace(',', ' ').split()
+    if not tokens:
+        return []
+    operator = tokens[0].lower()
+    if operator in PORT_OPERATORS:
+        return _apply_operator(operator, [_port_number(token) for token in tokens[1:]])
+    intervals = []
+    for token in tokens:
+        low, dash, high = token.partition('-')
+        if dash and low and (low.isdigit() or high.isdigit()):
+            intervals.extend(_port_range(_port_number(low), _port_number(high)))
+        else:
+            port = _port_number(token)
+            intervals.append((port, port))
+    return intervals
+
+
+def parse_ports(values, operator=None):
+    """Return a list of (low, high) intervals, or None when any port matches.
+
+    `operator` is the AVD `*_ports_match` value applied to the whole list.
+    Raises ValueError for an unknown port name or operator, an operator with
+    the wrong number of ports, or a port or range out of bounds.
+    """
+    values = as_list(values)
+    if any(str(value).strip().lower() in WILDCARDS for value in values):
+        return None
+    if not values:
+        return None
+    operator = (operator or 'eq').lower()
+    if operator != 'eq':
+        if operator not in PORT_OPERATORS:
+            raise ValueError(f"unknown port operator {operator!r}")
+        return _apply_operator(operator, [_port_number(value) for value in values])
+    intervals = []
+    for value in values:
+        intervals.extend(parse_port_expression(value))
+    return intervals
+
+
+def _merge(intervals):
+    merged = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+class ValueField:
+    """Exact-value field (protocol)."""
+
+    def __init__(self):
+        self.wildcard = 0
+        self.table = {}
+
+    def add(self, bit, values):
+        if values is None:
+            self.wildcard |= bit
+            return
+        for value in values:
+            self.table[value] = self.table.get(value, 0) | bit
+
+    def lookup(self, value):
+        return self.wildcard | self.table.get(value, 0)
+
+
+class IntervalField:
+    """Integer range field (ports), partitioned into elementary segments."""
+
+    def __init__(self):
+        self.wildcard = 0
+        self.intervals = []
+        self.starts = []
+        self.masks = []
+
+    def add(self, bit, intervals):
+        if intervals is None:
+            self.wildcard |= bit
+            return
+        for low, high in _merge(intervals):
+            self.intervals.append((low, high, bit))
+
+    def build(self):
+        events = {}
+        for low, high, bit in self.intervals:
+            events[low] = events.get(low, 0) ^ bit
+            events[high + 1] = events.get(high + 1, 0) ^ bit
+        mask = 0
+        for point in sorted(events):
+            mask ^= events[point]
+            self.starts.append(point)
+            self.masks.append(mask)
+        self.intervals = []
+
+    def lookup(self, value):
+        if value is None:
+            return self.wildcard
+        position = bisect_right(self.starts, value) - 1
+        if position < 0:
+            return self.wildcard
+        return self.wildcard | self.masks[position]
+
+
+class PrefixField:
+    """Address field, one hash table per (IP version, prefix length)."""
+
+    def __init__(self):
+        self.wildcard = 0
+        self.tables = {}
+
+    def add(self, bit, networks):
+        if networks is None:
+            self.wildcard |= bit
+            return
+        for network in networks:
+            key = (network.version, network.prefixlen)
+            shift = network.max_prefixlen - network.prefixlen
+            table = self.tables.setdefault(key, {})
+            prefix = int(network.network_address) >> shift
+            table[prefix] = table.get(prefix, 0) | bit
+
+    def lookup(self, value):
+        if not value:
+            return self.wildcard
+        try:
+            address = ipaddress.ip_address(value)
+        except ValueError:
+            return self.wildcard
+        number = int(address)
+        mask = self.wildcard
+        for (version, length), table in self.tables.items():
+            if version == address.version:
+                mask |= table.get(number >> (address.max_prefixlen - length), 0)
+        return mask
+
+
+class CompiledAcl:
+    """An ACL compiled for first-match classification of flows.
+
+    Entries that cannot be parsed (object-groups, unknown services, bad
+    sequence numbers) are left out of the classifier and listed in
+    `skipped` as (entry, reason), so callers can report them: without them
+    a flow may fall through to a later entry than the device would pick.
+    """
+
+    def __init__(self, acl):
+        self.name = acl.get('name', 'unknown')
+        self.skipped = []
+        entries = []
+        for entry in acl.get('entries', []):
+            if not entry.get('action'):
+                continue
+            sequence = entry.get('sequence')
+            if sequence is not None and not str(sequence).strip().isdigit():
+                self.skipped.append((entry, f"invalid sequence {sequence!r}"))
+                continue
+            entries.append(entry)
+        if all(entry.get('sequence') is not None for entry in entries):
+            entries.sort(key=lambda entry: int(entry['sequence']))
+        self.entries = []
+        self.protocol = ValueField()
+        self.source = PrefixField()
+        self.destination = PrefixField()
+        self.source_ports = IntervalField()
+        self.destination_ports = IntervalField()
+        for entry in entries:
+            try:
+                fields = self._parse_entry(entry)
+            except ValueError as e:
+                self.skipped.append((entry, str(e)))
+                continue
+            bit = 1 << len(self.entries)
+            self.entries.append(entry)
+            protocol, source, destination, source_ports, destination_ports = fields
+            self.protocol.add(bit, protocol)
+            self.source.add(bit, source)
+            self.destination.add(bit, destination)
+            self.source_ports.add(bit, source_ports)
+            self.destination_ports.add(bit, destination_ports)
+        self.source_ports.build()
+        self.destination_ports.build()
+
+    @staticmethod
+    def _parse_entry(entry):
+        protocol = parse_protocol(entry.get('protocol'))
+        addresses = []
+        for key in ('source', 'destination'):
+            values = [parse_address(value) for value in as_list(entry.get(key))]
+            addresses.append(None if not values or None in values else values)
+        return (
+            None if protocol is None else [protocol],
+            addresses[0],
+            addresses[1],
+            parse_ports(entry.get('source_ports'), entry.get('source_ports_match')),
+            parse_ports(entry.get('destination_ports'), entry.get('destination_ports_match')),
+        )
+
+    def match(self, flow):
+        """Return the first entry matching every field of `flow`, or None."""
+        index = self.match_index(flow)
+        return None if index < 0 else self.entries[index]
+
+    def match_index(self, flow):
+        """Return the position in `entries` of the first matching entry, or -1."""
+        mask = self.protocol.lookup(flow.get('protocol', 0))
+        if mask:
+            mask &= self.source.lookup(flow.get('src_ip'))
+        if mask:
+            mask &= self.destination.lookup(flow.get('dst_ip'))
+        if mask:
+            mask &= self.source_ports.lookup(flow.get('src_port', 0))
+        if mask:
+            mask &= self.destination_ports.lookup(flow.get('dst_port', 0))
+        return (mask & -mask).bit_length() - 1
+
+
+@lru_cache(maxsize=1024)
+def _compile_json(text):
+    return CompiledAcl(json.loads(text))
+
+
+def compile_acl(acl):
+    """Compile `acl`, reusing the compiled form of an identical ACL seen before.
+
+    Fabrics often apply the same ACL on many hosts, and long-running
+    callers (--watch, the API's /validate) see the same ACLs repeatedly.
+    """
+    return _compile_json(json.dumps(acl, sort_keys=True, default=str))
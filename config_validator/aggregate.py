@@ -0,0 +1,56 @@
+"""Traffic-volume aggregation of impacted flows with top-K reporting."""
+import heapq
+
+
+class ImpactAggregator:
+    """Running bytes/packets totals per (check, host, target, application).
+
+    Memory grows with the number of distinct groups, not with the number of
+    impacted flows, and only the K heaviest groups are ever reported.
+    """
+
+    def __init__(self, k=20):
+        self.k = k
+        self.groups = {}
+        self.counts = {}
+        self.hosts = {}
+
+    def add(self, check, host, target, app_service_name, flow):
+        key = (check, host, target, app_service_name)
+        totals = self.groups.get(key)
+        if totals is None:
+            totals = self.groups[key] = [0, 0, 0]
+        totals[0] += int(flow.get('bytes', 0))
+        totals[1] += int(flow.get('packets', 0))
+        totals[2] += 1
+        self.counts[check] = self.counts.get(check, 0) + 1
+        self.hosts.setdefault(check, set()).add(host)
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def top(self):
+        """Return the K groups with the most bytes (then packets), heaviest first."""
+        heaviest = heapq.nlargest(self.k, self.groups.items(), key=lambda item: (item[1][0], item[1][1]))
+        return [
+            {
+                'check': check,
+                'host': host,
+                'target': target,
+                'app_service_name': app_service_name,
+                'bytes': totals[0],
+                'packets': totals[1],
+                'flows': totals[2],
+            }
+            for (check, host, target, app_service_name), totals in heaviest
+        ]
+
+    def summary(self):
+        """Return impact, group and host counts per check."""
+        groups = {}
+        for check, _, _, _ in self.groups:
+            groups[check] = groups.get(check, 0) + 1
+        return {
+            check: {'impacts': count, 'groups': groups.get(check, 0), 'hosts': len(self.hosts[check])}
+            for check, count in self.counts.items()
+        }
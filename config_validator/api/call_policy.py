@@ -0,0 +1,146 @@
+"""Shared call policy for Clover RPCs: deadlines, jittered retries, hedging and an AIMD concurrency limit."""
+import random
+import threading
+import time
+
+import grpc
+
+from config_validator.api.metrics import CONCURRENCY_LIMIT, RPC_HEDGES, RPC_RETRIES
+
+# Codes worth retrying; CVaaS also uses them to signal throttling, so they
+# shrink the concurrency limit too.
+RETRYABLE = {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.RESOURCE_EXHAUSTED}
+
+
+def status_code(error):
+    return error.code() if hasattr(error, "code") else grpc.StatusCode.UNKNOWN
+
+
+class AimdLimiter:
+    """Concurrency limit with additive increase on success and multiplicative decrease on throttling."""
+
+    def __init__(self, initial=16, minimum=1, maximum=128, decrease=0.5, cooldown=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+        CONCURRENCY_LIMIT.labels().set(int(self.limit))
+
+    def __enter__(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def try_acquire(self):
+        with self.condition:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def on_success(self):
+        with self.condition:
+            # Roughly +1 per limit's worth of successful calls.
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            CONCURRENCY_LIMIT.labels().set(int(self.limit))
+            self.condition.notify_all()
+
+    def on_throttle(self):
+        with self.condition:
+            # One decrease per burst: calls already in flight when CVaaS starts
+            # throttling should not collapse the limit to its minimum.
+            now = time.monotonic()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            CONCURRENCY_LIMIT.labels().set(int(self.limit))
+
+
+class CallPolicy:
+    """Runs RPCs under a per-call deadline with retries, optional hedging and a concurrency limit.
+
+    `hedge_after` (seconds) sends a second copy of a slow unary call when
+    the limiter has spare capacity and returns whichever succeeds first.
+    """
+
+    def __init__(self, deadline=30.0, retries=3, backoff=0.1, max_backoff=2.0, hedge_after=None, limiter=None):
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.limiter = limiter or AimdLimiter()
+
+    def call(self, method, request, rpc, stream=False):
+        """Call `method(request)`; a streaming call's responses are returned as a list."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            error = None
+            with self.limiter:
+                timeout = max(deadline - time.monotonic(), 0.001)
+                try:
+                    if stream:
+                        response = list(method(request, timeout=timeout))
+                    elif self.hedge_after is not None and hasattr(method, "future"):
+                        response = self._hedged(method, request, timeout, rpc)
+                    else:
+                        response = method(request, timeout=timeout)
+                except grpc.RpcError as e:
+                    error = e
+            code = status_code(error) if error is not None else None
+            if error is None:
+                self.limiter.on_success()
+                return response
+            if code in RETRYABLE:
+                self.limiter.on_throttle()
+            # Full jitter keeps retries from many devices from arriving in lockstep.
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if code not in RETRYABLE or attempt >= self.retries or time.monotonic() + delay >= deadline:
+                raise error
+            RPC_RETRIES.labels(rpc=rpc, code=code.name).inc()
+            time.sleep(delay)
+            attempt += 1
+
+    def _hedged(self, method, request, timeout, rpc):
+        finished = threading.Event()
+        calls = [method.future(request, timeout=timeout)]
+        calls[0].add_done_callback(lambda _: finished.set())
+        hedged = False
+        if not finished.wait(min(self.hedge_after, timeout)) and self.limiter.try_acquire():
+            hedged = True
+            RPC_HEDGES.labels(rpc=rpc).inc()
+            hedge = method.future(request, timeout=max(timeout - self.hedge_after, 0.001))
+            hedge.add_done_callback(lambda _: finished.set())
+            calls.append(hedge)
+        try:
+            while True:
+                finished.wait()
+                finished.clear()
+                done = [call for call in calls if call.done()]
+                for call in done:
+                    if not call.cancelled() and call.exception() is None:
+                        for other in calls:
+                            if other is not call:
+                                other.cancel()
+                        return call.result()
+                if len(done) == len(calls):
+                    raise done[0].exception()
+        finally:
+            if hedged:
+                self.limiter.release()
@@ -0,0 +1,192 @@
+"""Local fake Clover gRPC server for load-testing the API layer without CVaaS.
+
+Serves synthetic flows (or a recorded snapshot) with optional injected
+latency and errors:
+
+    python -m config_validator.api.fake_clover --port 50051 --flows 5000 --latency 20 --error-rate 0.01 \\
+        --inventory /tmp/fake_inventory.json
+
+Point the API server at it with:
+
+    CONFIG_VALIDATOR_CV_SERVER=localhost:50051 CONFIG_VALIDATOR_CV_INSECURE=1 \\
+        CONFIG_VALIDATOR_INVENTORY=/tmp/fake_inventory.json uvicorn config_validator.api.main:app
+"""
+import argparse
+import json
+import random
+import time
+from concurrent import futures
+
+import grpc
+from google.protobuf.json_format import ParseDict
+
+from config_validator import synthetic
+from config_validator.api.snapshot import ReplayStub, Snapshot, SnapshotMiss
+from pkg.clover import clover_pb2, clover_pb2_grpc
+
+TOP_GROUPS = 10
+
+
+def serial(index):
+    return f"SN{index:04d}"
+
+
+def to_message(message, flow):
+    return ParseDict(flow, message(), ignore_unknown_fields=True)
+
+
+class FakeClover(clover_pb2_grpc.CloverServicer):
+    """Clover servicer backed by synthetic flows or a snapshot."""
+
+    def __init__(self, flows=1000, devices=4, top_responses=3, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_code=grpc.StatusCode.UNAVAILABLE, seed=0, snapshot=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.top_responses = top_responses
+        self.rng = random.Random(seed)
+        self.replay = ReplayStub(snapshot) if snapshot else None
+        if snapshot:
+            self.inventory = snapshot.inventory
+            return
+
+        self.inventory = [{'hostname': synthetic.hostname(index), 'serialNumber': serial(index)}
+                          for index in range(devices)]
+        self.connection_stats = {}
+        self.breakdowns = {}
+        for index in range(devices):
+            device_id = serial(index)
+            device_flows = synthetic.generate_flows(flows, seed=seed + index, device_id=device_id)
+            self.connection_stats[device_id] = clover_pb2.ConnectionStatsResponse(
+                connection_stats=[to_message(clover_pb2.ConnectionStats, flow) for flow in device_flows])
+            self.breakdowns[device_id] = clover_pb2.BreakdownResponse(
+                entries=[to_message(clover_pb2.FlowStats, {**flow, 'flows': 1}) for flow in device_flows])
+        fabric_flows = synthetic.generate_flows(flows, seed=seed + devices, path_devices=devices)
+        self.connection_stats[""] = clover_pb2.ConnectionStatsResponse(
+            connection_stats=[to_message(clover_pb2.ConnectionStats, flow) for flow in fabric_flows])
+        self.top = clover_pb2.TopResponse(groups=sorted(
+            (entry for response in self.breakdowns.values() for entry in response.entries),
+            key=lambda entry: -entry.bytes,
+        )[:TOP_GROUPS])
+
+    def _delay_or_fail(self, context):
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            context.abort(self.error_code, "injected error")
+
+    def _replay(self, rpc, request, context):
+        try:
+            return getattr(self.replay, rpc)(request)
+        except SnapshotMiss as e:
+            context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+
+    def GetConnectionStats(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            return self._replay("GetConnectionStats", request, context)
+        response = self.connection_stats.get(request.filter.device_id, clover_pb2.ConnectionStatsResponse())
+        if request.limit:
+            return clover_pb2.ConnectionStatsResponse(
+                connection_stats=response.connection_stats[request.offset:request.offset + request.limit])
+        return response
+
+    def GetBreakdown(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            return self._replay("GetBreakdown", request, context)
+        return self.breakdowns.get(request.filter.device_id, clover_pb2.BreakdownResponse())
+
+    def StreamTop(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            yield from self._replay("StreamTop", request, context)
+            return
+        now = int(time.time() * 1000)
+        for index in range(self.top_responses):
+            response = clover_pb2.TopResponse()
+            response.CopyFrom(self.top)
+            response.start = now + index * 1000
+            response.end = now + (index + 1) * 1000
+            yield response
+
+    def GetCount(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            return self._replay("GetCount", request, context)
+        response = self.connection_stats.get(request.filter.device_id)
+        return clover_pb2.CountResponse(count=len(response.connection_stats) if response else 0)
+
+    def GetSamplingRate(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            return self._replay("GetSamplingRate", request, context)
+        rate = clover_pb2.SamplingRate(size=1, population=1000)
+        return clover_pb2.SamplingRateResponse(min=rate, max=rate)
+
+    def GetHostnames(self, request, context):
+        self._delay_or_fail(context)
+        if self.replay:
+            return self._replay("GetHostnames", request, context)
+        if request.device_id in self.connection_stats:
+            # Name every endpoint the device has seen, e.g. 10.1.2.3 -> host-10-1-2-3.
+            ips = sorted({ip for flow in self.connection_stats[request.device_id].connection_stats
+                          for ip in (flow.src_ip, flow.dst_ip)})
+            return clover_pb2.HostnamesResponse(hosts=[
+                clover_pb2.HostnamesResponse.HostResult(
+                    hostname=f"host-{ip.replace('.', '-')}", ip=ip, device_id=request.device_id)
+                for ip in ips
+            ])
+        return clover_pb2.HostnamesResponse(hosts=[
+            clover_pb2.HostnamesResponse.HostResult(hostname=device['hostname'], device_id=device['serialNumber'])
+            for device in self.inventory
+        ])
+
+
+def serve(servicer, address="localhost:50051", max_workers=32):
+    """Start an insecure server for `servicer`; return the server and its bound port."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    clover_pb2_grpc.add_CloverServicer_to_server(servicer, server)
+    port = server.add_insecure_port(address)
+    server.start()
+    return server, port
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake Clover gRPC server.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=50051, help="0 picks a free port")
+    parser.add_argument("--flows", type=int, default=1000, help="flows per device")
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--top-responses", type=int, default=3, help="messages per StreamTop call")
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per RPC in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to N ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of RPCs that fail")
+    parser.add_argument("--error-code", default="UNAVAILABLE", choices=[code.name for code in grpc.StatusCode])
+    parser.add_argument("--replay", metavar="SNAPSHOT", help="serve responses from a recorded snapshot")
+    parser.add_argument("--inventory", metavar="PATH", help="write the device inventory JSON for the API server")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    servicer = FakeClover(
+        flows=args.flows, devices=args.devices, top_responses=args.top_responses,
+        latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+        error_code=grpc.StatusCode[args.error_code], seed=args.seed,
+        snapshot=Snapshot.load(args.replay) if args.replay else None,
+    )
+    if args.inventory:
+        with open(args.inventory, "w") as f:
+            json.dump(servicer.inventory, f)
+    server, port = serve(servicer, f"{args.host}:{args.port}", args.workers)
+    print(f"Fake Clover listening on {args.host}:{port}", flush=True)
+    try:
+        server.wait_for_termination()
+    except KeyboardInterrupt:
+        server.stop(grace=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,32 @@ import grpc
 import os
 import json
 import logging
-from fastapi import FastAPI, Path
-from typing import Dict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Path, Query, Request
+from pydantic import BaseModel
+from typing import Dict, List, Optional
 from google.protobuf.json_format import MessageToDict
 
 
 # Import generated gRPC files (assuming you've generated them using `protoc`)
 from pkg.clover import clover_pb2, clover_pb2_grpc
+from fastapi.responses import JSONResponse, PlainTextResponse
+from config_validator.api.call_policy import CallPolicy, status_code
+from config_validator.api.metrics import (
+    CACHE_REQUESTS, DEVICE_FLOWS, REGISTRY, RPC_IN_FLIGHT, RPC_LATENCY, RPC_REQUESTS, RPC_RESPONSE_SIZE,
+    HTTP_LATENCY, HTTP_REQUESTS,
+)
+from config_validator.api.snapshot import STREAMING_RPCS, RecordingStub, ReplayStub, Snapshot
+from config_validator.critical import screen_indexed, with_critical
+from config_validator.flow_cache import FLOW_TTL, FlowCache
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import get_shutdown_ports, run_checks
+from config_validator.report import FindingLimitReached, Report
+from config_validator.timing import format_server_timing, request_spans, server_span, tracer
 
 config_dir = os.path.expanduser("~/.config/config_validator")
 METADATA_FILE = os.path.join(config_dir, "metadata.json")
-print("Metada", METADATA_FILE)
 
 def load_metadata():
     if os.path.exists(METADATA_FILE):
@@ -24,31 +39,89 @@ def load_metadata():
 metadata = load_metadata()
 AUTH_TOKEN = metadata.get("access_token", None)
 # Constants
-timeout = 30
-cv_server = "www.cv-staging.corp.arista.io:443"
+# Call policy for every Clover RPC; see config_validator/api/call_policy.py.
+RPC_DEADLINE = float(os.getenv("CONFIG_VALIDATOR_RPC_DEADLINE", "30"))
+RPC_RETRIES = int(os.getenv("CONFIG_VALIDATOR_RPC_RETRIES", "3"))
+HEDGE_AFTER = float(os.getenv("CONFIG_VALIDATOR_HEDGE_AFTER", "0")) or None
+# How long /validate reuses a device's flows before fetching them again.
+FLOW_CACHE_TTL = float(os.getenv("CONFIG_VALIDATOR_FLOW_TTL", str(FLOW_TTL)))
+cv_server = os.getenv("CONFIG_VALIDATOR_CV_SERVER", "www.cv-staging.corp.arista.io:443")
+# Plaintext channel, e.g. for the local fake Clover server used in load tests.
+CV_INSECURE = bool(os.getenv("CONFIG_VALIDATOR_CV_INSECURE"))
+# JSON inventory ([{"hostname", "serialNumber"}]) used instead of querying CVP.
+INVENTORY_PATH = os.getenv("CONFIG_VALIDATOR_INVENTORY")
 # AUTH_TOKEN = os.getenv("ACCESS_TOKEN") 
-from cvprac.cvp_client import CvpClient
 
-# Initialize the CVP client
-clnt = CvpClient()
+# Offline snapshots: record live responses to a file, or replay them without CVaaS.
+RECORD_PATH = os.getenv("CONFIG_VALIDATOR_RECORD")
+REPLAY_PATH = os.getenv("CONFIG_VALIDATOR_REPLAY")
+snapshot = Snapshot.load(REPLAY_PATH) if REPLAY_PATH else Snapshot()
 
-# Connect to CVaaS using your API token
-clnt.connect(
-    nodes=['www.cv-staging.corp.arista.io'],  # Replace with your CVaaS endpoint
-    username='',              # Username is ignored when using API token
-    password='',              # Password is ignored when using API token
-    is_cvaas=True,
-    api_token=AUTH_TOKEN)
+def load_inventory():
+    if REPLAY_PATH:
+        return snapshot.inventory
+    if INVENTORY_PATH:
+        with open(INVENTORY_PATH) as f:
+            snapshot.inventory = json.load(f)
+        return snapshot.inventory
 
-# Retrieve the device inventory
+    from cvprac.cvp_client import CvpClient
+
+    # Initialize the CVP client
+    clnt = CvpClient()
+
+    # Connect to CVaaS using your API token
+    clnt.connect(
+        nodes=['www.cv-staging.corp.arista.io'],  # Replace with your CVaaS endpoint
+        username='',              # Username is ignored when using API token
+        password='',              # Password is ignored when using API token
+        is_cvaas=True,
+        api_token=AUTH_TOKEN)
+    inventory = clnt.api.get_inventory()
+    snapshot.inventory = [
+        {"hostname": device.get("hostname"), "serialNumber": device.get("serialNumber")} for device in inventory
+    ]
+    return inventory
+
+# Device inventory, filled at startup rather than on import.
 device_map: Dict[str, str] = {}
-inventory = clnt.api.get_inventory()
-for device in inventory:
-    device_map[device.get('hostname').lower()] = device.get('serialNumber')
+hostname_map: Dict[str, str] = {}
+
+def warm_inventory():
+    inventory_start = time.perf_counter()
+    for device in load_inventory():
+        device_map[device.get('hostname').lower()] = device.get('serialNumber')
+    hostname_map.update({serial: hostname for hostname, serial in device_map.items()})
+    logging.info(f"Loaded inventory of {len(device_map)} devices in {(time.perf_counter() - inventory_start) * 1000:.0f} ms")
+
 
+def signal_ready():
+    """Tell the parent runner that startup finished, via the pipe it passed in."""
+    ready_fd = os.getenv("CONFIG_VALIDATOR_READY_FD")
+    if not ready_fd:
+        return
+    try:
+        os.write(int(ready_fd), b"ready\n")
+        os.close(int(ready_fd))
+    except OSError as e:
+        logging.warning(f"Could not signal readiness: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_inventory()
+    signal_ready()
+    yield
+    if RECORD_PATH:
+        snapshot.save(RECORD_PATH)
+        logging.info(f"Recorded {len(snapshot.responses)} responses to {RECORD_PATH}")
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+policy = CallPolicy(deadline=RPC_DEADLINE, retries=RPC_RETRIES, hedge_after=HEDGE_AFTER)
+flow_cache = FlowCache(FLOW_CACHE_TTL)
+tracer.enabled = False  # /validate runs the CLI's checks; per-request timing goes to Server-Timing
+validate_executor = ThreadPoolExecutor(max_workers=16)
 
 # Metadata Plugin for Token Authentication
 class AuthMetadataPlugin(grpc.AuthMetadataPlugin):
@@ -57,12 +130,89 @@ class AuthMetadataPlugin(grpc.AuthMetadataPlugin):
 
 # Setup gRPC connection with authentication
 def get_grpc_client():
-    ssl_creds = grpc.ssl_channel_credentials()
-    auth_creds = grpc.metadata_call_credentials(AuthMetadataPlugin())
-    creds = grpc.composite_channel_credentials(ssl_creds, auth_creds)
+    if REPLAY_PATH:
+        return ReplayStub(snapshot)
+    if CV_INSECURE:
+        channel = grpc.insecure_channel(cv_server)
+    else:
+        ssl_creds = grpc.ssl_channel_credentials()
+        auth_creds = grpc.metadata_call_credentials(AuthMetadataPlugin())
+        creds = grpc.composite_channel_credentials(ssl_creds, auth_creds)
+        channel = grpc.secure_channel(cv_server, creds)
+    stub = clover_pb2_grpc.CloverStub(channel)
+    return RecordingStub(stub, snapshot) if RECORD_PATH else stub
+
+def resolve_device(device_id: str) -> str:
+    serial = device_map.get(device_id.lower())
+    CACHE_REQUESTS.labels(cache="device_map", result="hit" if serial else "miss").inc()
+    return serial or device_id
+
+def call_rpc(client, rpc: str, request):
+    """Call a Clover RPC under the call policy and convert the response, timing both phases."""
+    stream = rpc in STREAMING_RPCS
+    in_flight = RPC_IN_FLIGHT.labels(rpc=rpc)
+    in_flight.inc()
+    start = time.perf_counter()
+    code = "OK"
+    try:
+        with server_span("grpc"):
+            response = policy.call(getattr(client, rpc), request, rpc, stream=stream)
+    except grpc.RpcError as e:
+        code = status_code(e).name
+        raise
+    finally:
+        in_flight.dec()
+        RPC_LATENCY.labels(rpc=rpc).observe(time.perf_counter() - start)
+        RPC_REQUESTS.labels(rpc=rpc, code=code).inc()
+    if stream:
+        RPC_RESPONSE_SIZE.labels(rpc=rpc).observe(sum(message.ByteSize() for message in response))
+        with server_span("decode"):
+            return [MessageToDict(message, preserving_proto_field_name=True) for message in response]
+    RPC_RESPONSE_SIZE.labels(rpc=rpc).observe(response.ByteSize())
+    with server_span("decode"):
+        return MessageToDict(response, preserving_proto_field_name=True)
+
+# Clover failures surface as HTTP errors rather than an empty-looking 200.
+ERROR_STATUS = {
+    grpc.StatusCode.NOT_FOUND: 404,
+    grpc.StatusCode.DEADLINE_EXCEEDED: 504,
+    grpc.StatusCode.UNAVAILABLE: 503,
+    grpc.StatusCode.RESOURCE_EXHAUSTED: 503,
+}
+
+@app.exception_handler(grpc.RpcError)
+async def rpc_error(request: Request, exc: grpc.RpcError):
+    code = status_code(exc)
+    details = exc.details() if hasattr(exc, "details") else str(exc)
+    logging.error(f"Clover RPC for {request.url.path} failed: {code.name}: {details}")
+    return JSONResponse(
+        status_code=ERROR_STATUS.get(code, 502),
+        content={"error": f"Clover RPC failed: {code.name}", "details": details},
+    )
+
+@app.middleware("http")
+async def add_server_timing(request: Request, call_next):
+    token = request_spans.set([])
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        spans = request_spans.get()
+    finally:
+        request_spans.reset(token)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_REQUESTS.labels(route=route, method=request.method, status=response.status_code).inc()
+    HTTP_LATENCY.labels(route=route).observe(time.perf_counter() - start)
+    if spans:
+        response.headers["Server-Timing"] = format_server_timing(spans)
+    return response
 
-    channel = grpc.secure_channel(cv_server, creds)
-    return clover_pb2_grpc.CloverStub(channel)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok", "devices": len(device_map)}
 
 @app.get("/")
 def home():
@@ -70,7 +220,7 @@ def home():
 
 @app.get("/{device_id}/flows")
 def get_flows(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     
     client = get_grpc_client()
     request = clover_pb2.BreakdownRequest(
@@ -100,35 +250,209 @@ def get_flows(device_id: str = Path(..., title="Device ID")):
     )
 
     
-    try:
-        response = client.GetBreakdown(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error getting breakdown: {e}")
-        return {"error": "Failed to fetch breakdown data"}
+    return call_rpc(client, "GetBreakdown", request)
 
-@app.get("/{device_id}/connection_stats")
-def get_connection_stats(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+def fetch_fabric_flows():
     client = get_grpc_client()
-    
+
+    # INT data carries the per-hop path; no device filter returns the whole fabric.
     request = clover_pb2.ConnectionStatsRequest(
-        
         filter=clover_pb2.FlowFilter(
-            device_id=device_id,
+            data_source=clover_pb2.INT,
             start=int((time.time() - 300) * 1000),
             end=int(time.time() * 1000),
         ),)
+    stats = call_rpc(client, "GetConnectionStats", request)
+
+    for flow in stats.get("connection_stats", []):
+        for node in flow.get("path", {}).get("nodes", []):
+            node["hostname"] = hostname_map.get(node.get("device_id"), node.get("device_id"))
+    return stats
+
+@app.get("/fabric/connection_stats")
+def get_fabric_connection_stats():
+    return fetch_fabric_flows()
+
+def criteria(interfaces=None, src_ips=None, dst_ips=None, src_ports=None, dst_ports=None, protocols=None):
+    """Optional server-side pre-filter, sent as FlowFilter.include."""
+    return {
+        field: values for field, values in (
+            ("interfaces", interfaces),
+            ("src_ips", src_ips),
+            ("dst_ips", dst_ips),
+            ("src_ports", src_ports),
+            ("dst_ports", dst_ports),
+            ("protocols", protocols),
+        ) if values
+    }
+
+def device_filter(device_id: str, include: Optional[dict] = None, start: Optional[int] = None,
+                  end: Optional[int] = None):
+    return clover_pb2.FlowFilter(
+        device_id=device_id,
+        start=start or int((time.time() - 300) * 1000),
+        end=end or int(time.time() * 1000),
+        include=clover_pb2.FlowFilter.Criteria(**include) if include else None,
+    )
+
+@app.get("/{device_id}/connection_stats")
+def get_connection_stats(
+    device_id: str = Path(..., title="Device ID"),
+    interfaces: Optional[List[str]] = Query(None),
+    src_ips: Optional[List[str]] = Query(None),
+    dst_ips: Optional[List[str]] = Query(None),
+    src_ports: Optional[List[int]] = Query(None),
+    dst_ports: Optional[List[int]] = Query(None),
+    protocols: Optional[List[int]] = Query(None),
+    start: Optional[int] = Query(None, description="window start, ms since the epoch (default: 5 minutes ago)"),
+    end: Optional[int] = Query(None, description="window end, ms since the epoch (default: now)"),
+    limit: Optional[int] = Query(None, description="page size; pages are read with `offset`"),
+    offset: int = Query(0),
+    sort_by: Optional[List[str]] = Query(None, description="Metric names to sort by, ascending, e.g. START"),
+):
+    device_id = resolve_device(device_id)
+    include = criteria(interfaces, src_ips, dst_ips, src_ports, dst_ports, protocols)
+    unknown = set(sort_by or []) - set(clover_pb2.Metric.keys())
+    if unknown:
+        return JSONResponse(status_code=422, content={"error": f"Cannot sort by {', '.join(sorted(unknown))}"})
+    return fetch_device_flows(device_id, include, start, end, limit, offset, sort_by)
+
+def fetch_device_flows(device_id: str, include: Optional[dict] = None, start: Optional[int] = None,
+                       end: Optional[int] = None, limit: Optional[int] = None, offset: int = 0,
+                       sort_by: Optional[List[str]] = None):
+    client = get_grpc_client()
+    request = clover_pb2.ConnectionStatsRequest(
+        filter=device_filter(device_id, include, start, end), limit=limit or 0, offset=offset,
+        sort_by=[clover_pb2.SortMetric(metric=clover_pb2.Metric.Value(name), ascending=True) for name in sort_by or []],
+    )
+    stats = call_rpc(client, "GetConnectionStats", request)
+    if not limit:
+        DEVICE_FLOWS.labels(device=device_id).set(len(stats.get("connection_stats", [])))
+    return stats
+
+# The only flow fields the checks read; everything else stays on the server.
+TUPLE_FIELDS = ("src_ip", "dst_ip", "src_port", "dst_port", "protocol", "ingress_interface", "egress_interface")
+
+def tuples_to_flows(entries: List[dict]) -> List[dict]:
+    """Fold per-application breakdown entries into connection-stats-shaped flows.
+
+    Each distinct tuple becomes one flow listing its applications, with
+    bytes and packets summed, so the checks consume it unchanged.
+    """
+    flows = {}
+    for entry in entries:
+        key = tuple(entry.get(field) for field in TUPLE_FIELDS)
+        flow = flows.get(key)
+        if flow is None:
+            flow = flows[key] = {field: entry[field] for field in TUPLE_FIELDS if field in entry}
+            flow.update(bytes=0, packets=0, applications=[])
+        flow["bytes"] += int(entry.get("bytes", 0))
+        flow["packets"] += int(entry.get("packets", 0))
+        names = [entry["app_service_name"]] if entry.get("app_service_name") else [
+            app.get("app_service_name", "unknown") for app in entry.get("applications", [])
+        ] or ["unknown"]
+        known = {app["app_service_name"] for app in flow["applications"]}
+        flow["applications"].extend({"app_service_name": name} for name in names if name not in known)
+    return list(flows.values())
+
+@app.get("/{device_id}/flow_tuples")
+def get_flow_tuples(
+    device_id: str = Path(..., title="Device ID"),
+    interfaces: Optional[List[str]] = Query(None),
+    src_ips: Optional[List[str]] = Query(None),
+    dst_ips: Optional[List[str]] = Query(None),
+    src_ports: Optional[List[int]] = Query(None),
+    dst_ports: Optional[List[int]] = Query(None),
+    protocols: Optional[List[int]] = Query(None),
+    start: Optional[int] = Query(None, description="window start, ms since the epoch (default: 5 minutes ago)"),
+    end: Optional[int] = Query(None, description="window end, ms since the epoch (default: now)"),
+):
+    """Distinct flow tuples per application, deduplicated by Clover, in the /connection_stats shape."""
+    device_id = resolve_device(device_id)
+    include = criteria(interfaces, src_ips, dst_ips, src_ports, dst_ports, protocols)
+    return fetch_device_tuples(device_id, include, start, end)
+
+def fetch_device_tuples(device_id: str, include: Optional[dict] = None, start: Optional[int] = None,
+                        end: Optional[int] = None):
+    client = get_grpc_client()
+    request = clover_pb2.BreakdownRequest(
+        filter=device_filter(device_id, include, start, end),
+        deduplicate=True,
+        app_service_name=True,
+        **{field: True for field in TUPLE_FIELDS},
+    )
+    breakdown = call_rpc(client, "GetBreakdown", request)
+    with server_span("fold"):
+        flows = tuples_to_flows(breakdown.get("entries", []))
+    DEVICE_FLOWS.labels(device=device_id).set(len(flows))
+    return {"connection_stats": flows}
+
+class HostConfig(BaseModel):
+    ip_access_lists: List[dict] = []
+    ethernet_interfaces: List[dict] = []
+    port_channel_interfaces: List[dict] = []
+    vlan_interfaces: List[dict] = []
+
+class ValidateRequest(BaseModel):
+    hosts: Dict[str, HostConfig]
+    top: Optional[int] = None
+    max_findings: Optional[int] = None
+
+def cached_flows(key: str, fetch):
+    CACHE_REQUESTS.labels(cache="flows", result="hit" if flow_cache.fresh(key) else "miss").inc()
+    return flow_cache.get(key, fetch)
+
+def screened_device_flows(host: str, acls, shutdown_ports, vlans):
+    prescreen = build_prescreen(acls, shutdown_ports, vlans)
+    if prescreen.empty:
+        return {"connection_stats": []}
+    device_id = resolve_device(host)
+    flows = cached_flows(device_id, lambda: with_critical(fetch_device_flows(device_id)))
+    return screen_indexed(flows, prescreen)
+
+@app.post("/validate")
+def validate(body: ValidateRequest):
+    """Check candidate configs against this server's cached flows and return the findings."""
+    acl_policies = {host: config.ip_access_lists for host, config in body.hosts.items()}
+    interfaces_data = {
+        host: {
+            "port_channel_interfaces": config.port_channel_interfaces,
+            "ethernet_interfaces": config.ethernet_interfaces,
+        }
+        for host, config in body.hosts.items()
+    }
+    vlan_configs = {host: config.vlan_interfaces for host, config in body.hosts.items()}
+    host_flows = {
+        host: validate_executor.submit(
+            screened_device_flows,
+            host,
+            acl_policies[host],
+            get_shutdown_ports(host, interfaces_data),
+            vlan_configs[host],
+        )
+        for host in body.hosts
+    }
+    fabric_flows = None
+    if any(get_shutdown_ports(host, interfaces_data) for host in body.hosts):
+        fabric_flows = validate_executor.submit(cached_flows, "", fetch_fabric_flows)
+
+    report = Report(top=body.top, max_findings=body.max_findings)
     try:
-        response = client.GetConnectionStats(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching connection stats: {e}")
-        return {"error": "Failed to fetch connection stats"}
+        with server_span("checks"):
+            run_checks(report, acl_policies, interfaces_data, vlan_configs, host_flows, fabric_flows)
+    except FindingLimitReached:
+        pass
+    return {
+        "conflicts": report.conflicts(),
+        "truncated": report.truncated,
+        "checked": report.checked,
+        "findings": report.results(),
+        "warnings": report.warnings,
+    }
 
 @app.get("/{device_id}/aggregate_time_series")
 def get_aggregate_time_series(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.AggregateTimeSeriesRequest(
@@ -163,16 +487,11 @@ def get_aggregate_time_series(device_id: str = Path(..., title="Device ID")):
             end=int(time.time() * 1000),
         ),
     )
-    try:
-        response = client.GetAggregateTimeSeries(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching aggregate time series: {e}")
-        return {"error": "Failed to fetch aggregate time series data"}
+    return call_rpc(client, "GetAggregateTimeSeries", request)
 
 @app.get("/{device_id}/sampling_rate")
 def get_sampling_rate(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.SamplingRateRequest(
@@ -182,51 +501,41 @@ def get_sampling_rate(device_id: str = Path(..., title="Device ID")):
             end=int(time.time() * 1000),
         ),
     )
-    try:
-        response = client.GetSamplingRate(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching sampling rate: {e}")
-        return {"error": "Failed to fetch sampling rate"}
+    return call_rpc(client, "GetSamplingRate", request)
 
 @app.get("/{device_id}/count")
-def get_count(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+def get_count(
+    device_id: str = Path(..., title="Device ID"),
+    group_by: Optional[List[str]] = Query(None, description="CountRequest fields to group by (default: dst_ip)"),
+):
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
+    group_by = group_by or ["dst_ip"]
+    unknown = set(group_by) - (set(clover_pb2.CountRequest.DESCRIPTOR.fields_by_name) - {"filter"})
+    if unknown:
+        return JSONResponse(status_code=422, content={"error": f"Cannot group by {', '.join(sorted(unknown))}"})
     
     request = clover_pb2.CountRequest(
-        # src_ip=True,
-        dst_ip=True,
-        # user_identity=True,
+        **{field: True for field in group_by},
         filter=clover_pb2.FlowFilter(
             device_id=device_id,
             start=int((time.time() - 300) * 1000),
             end=int(time.time() * 1000),
         ),
     )
-    try:
-        response = client.GetCount(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching count: {e}")
-        return {"error": "Failed to fetch count data"}
+    return call_rpc(client, "GetCount", request)
 
 @app.get("/{device_id}/hostnames")
 def get_hostnames(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.HostnamesRequest(device_id=device_id)
-    try:
-        response = client.GetHostnames(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching hostnames: {e}")
-        return {"error": "Failed to fetch hostnames"}
+    return call_rpc(client, "GetHostnames", request)
 
 @app.get("/{device_id}/src_dst_app_stats")
 def get_src_dst_app_stats(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.AppStatsRequest(
@@ -237,16 +546,11 @@ def get_src_dst_app_stats(device_id: str = Path(..., title="Device ID")):
             start=int((time.time() - 300) * 1000),
             end=int(time.time() * 1000),
         ),)
-    try:
-        response = client.GetSrcDstAppStats(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching src-dst app stats: {e}")
-        return {"error": "Failed to fetch source-destination application stats"}
+    return call_rpc(client, "GetSrcDstAppStats", request)
 
 @app.get("/{device_id}/dapper_stats")
 def get_dapper_stats(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.DapperStatsRequest(
@@ -270,16 +574,11 @@ def get_dapper_stats(device_id: str = Path(..., title="Device ID")):
             end=int(time.time() * 1000),
         ),
         )
-    try:
-        response = client.GetDapperStats(request)
-        return MessageToDict(response, preserving_proto_field_name=True)
-    except grpc.RpcError as e:
-        logging.error(f"Error fetching dapper stats: {e}")
-        return {"error": "Failed to fetch dapper stats"}
+    return call_rpc(client, "GetDapperStats", request)
 
 @app.get("/{device_id}/top_flows")
 def stream_top_flows(device_id: str = Path(..., title="Device ID")):
-    device_id = device_map.get(device_id.lower(), device_id)
+    device_id = resolve_device(device_id)
     client = get_grpc_client()
     
     request = clover_pb2.BreakdownRequest(
@@ -301,12 +600,7 @@ def stream_top_flows(device_id: str = Path(..., title="Device ID")):
             start=int((time.time() - 300) * 1000),
             end=int(time.time() * 1000),
         ),)
-    try:
-        response_stream = client.StreamTop(request)
-        return [MessageToDict(response, preserving_proto_field_name=True) for response in response_stream]
-    except grpc.RpcError as e:
-        logging.error(f"Error streaming top flows: {e}")
-        return {"error": "Failed to stream top flows"}
+    return call_rpc(client, "StreamTop", request)
 
 
 
@@ -0,0 +1,148 @@
+"""Minimal Prometheus text-format metrics for the API server."""
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def labels(self, **labels):
+        return _Child(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, (), value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class _Child:
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount=1):
+        with self.metric.lock:
+            self.metric.values[self.key] = self.metric.values.get(self.key, 0) + amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self.metric.lock:
+            self.metric.values[self.key] = value
+
+    def observe(self, value):
+        self.metric.observe(self.key, value)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, key, value):
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0, 0.0]
+            position = bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                state[0][position] += 1
+            state[1] += 1
+            state[2] += value
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, count, total) in self.values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", key, (("le", _format_value(float(bound))),), cumulative))
+                samples.append((f"{self.name}_bucket", key, (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_count", key, (), count))
+                samples.append((f"{self.name}_sum", key, (), total))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+RPC_REQUESTS = REGISTRY.register(Counter(
+    "clover_rpc_requests_total", "Clover RPCs by method and status code.", ("rpc", "code")))
+RPC_LATENCY = REGISTRY.register(Histogram(
+    "clover_rpc_duration_seconds", "Clover RPC latency in seconds.", ("rpc",)))
+RPC_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "clover_rpc_response_bytes", "Serialized Clover response size in bytes.", ("rpc",), SIZE_BUCKETS))
+RPC_IN_FLIGHT = REGISTRY.register(Gauge(
+    "clover_rpc_in_flight", "Clover RPCs currently in flight.", ("rpc",)))
+RPC_RETRIES = REGISTRY.register(Counter(
+    "clover_rpc_retries_total", "Clover RPC retries by method and the status code that triggered them.", ("rpc", "code")))
+RPC_HEDGES = REGISTRY.register(Counter(
+    "clover_rpc_hedges_total", "Hedged Clover RPCs sent because the first attempt was slow.", ("rpc",)))
+CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "clover_rpc_concurrency_limit", "Current AIMD limit on concurrent Clover RPCs."))
+DEVICE_FLOWS = REGISTRY.register(Gauge(
+    "config_validator_device_flows", "Flows returned by the last connection stats fetch per device.", ("device",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "config_validator_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests served by route and status.", ("route", "method", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ("route",)))
@@ -0,0 +1,194 @@
+"""Record Clover responses and the device inventory to a snapshot file, and replay them.
+
+A snapshot is a gzip stream of length-prefixed records. Each record is a
+small JSON header (rpc, request key, payload count) followed by the
+serialized protobuf payloads, so responses are stored in their compact
+wire format rather than as JSON.
+"""
+import gzip
+import hashlib
+import json
+import struct
+import threading
+from concurrent.futures import Future
+
+import grpc
+
+from pkg.clover import clover_pb2
+
+MAGIC = b"CVSNAP1\n"
+INVENTORY = "inventory"
+STREAMING_RPCS = {"StreamTop"}
+_SERVICE = clover_pb2.DESCRIPTOR.services_by_name["Clover"]
+
+
+def response_class(rpc):
+    return getattr(clover_pb2, _SERVICE.methods_by_name[rpc].output_type.name)
+
+
+def _clear_window(message):
+    for field in ("start", "end"):
+        if message.DESCRIPTOR.fields_by_name.get(field) is not None:
+            message.ClearField(field)
+
+
+def request_key(request):
+    """The device a request is scoped to, plus a digest of everything else it asks for.
+
+    Filters, group-by flags, sorting and paging all change the response, so
+    they are part of the key; only the time window is left out, because a
+    replay asks for "now".
+    """
+    stable = type(request)()
+    stable.CopyFrom(request)
+    _clear_window(stable)
+    if stable.DESCRIPTOR.fields_by_name.get("filter") is not None and stable.HasField("filter"):
+        _clear_window(stable.filter)
+    digest = hashlib.sha1(stable.SerializeToString(deterministic=True)).hexdigest()[:16]
+    return f"{_device_key(request)}#{digest}"
+
+
+def _device_key(request):
+    if request.DESCRIPTOR.fields_by_name.get("device_id") is not None:
+        return request.device_id
+    if request.DESCRIPTOR.fields_by_name.get("filter") is not None and request.HasField("filter"):
+        request_filter = request.filter
+        if request_filter.DESCRIPTOR.fields_by_name.get("device_id") is not None:
+            return request_filter.device_id or ",".join(request_filter.device_ids)
+    return ""
+
+
+def _write_block(f, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(data)
+
+
+def _read_block(f):
+    size = f.read(4)
+    if not size:
+        return None
+    return f.read(struct.unpack(">I", size)[0])
+
+
+class Snapshot:
+    def __init__(self):
+        self.inventory = []
+        self.responses = {}
+        self.lock = threading.Lock()
+
+    def put(self, rpc, key, payloads):
+        with self.lock:
+            self.responses[(rpc, key)] = list(payloads)
+
+    def get(self, rpc, key):
+        return self.responses.get((rpc, key))
+
+    def save(self, path):
+        with self.lock:
+            items = list(self.responses.items())
+        with gzip.open(path, "wb") as f:
+            f.write(MAGIC)
+            _write_block(f, json.dumps({"rpc": INVENTORY, "key": "", "count": 1}).encode())
+            _write_block(f, json.dumps(self.inventory).encode())
+            for (rpc, key), payloads in items:
+                _write_block(f, json.dumps({"rpc": rpc, "key": key, "count": len(payloads)}).encode())
+                for payload in payloads:
+                    _write_block(f, payload)
+
+    @classmethod
+    def load(cls, path):
+        snapshot = cls()
+        with gzip.open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a config_validator snapshot")
+            while True:
+                header = _read_block(f)
+                if header is None:
+                    break
+                header = json.loads(header)
+                payloads = [_read_block(f) for _ in range(header["count"])]
+                if header["rpc"] == INVENTORY:
+                    snapshot.inventory = json.loads(payloads[0])
+                else:
+                    snapshot.responses[(header["rpc"], header["key"])] = payloads
+        return snapshot
+
+
+class SnapshotMiss(grpc.RpcError):
+    def __init__(self, rpc, key):
+        super().__init__(f"{rpc} for {key.partition('#')[0] or 'fabric'} with these parameters is not in the snapshot")
+        self.rpc = rpc
+        self.key = key
+
+    def code(self):
+        return grpc.StatusCode.NOT_FOUND
+
+    def details(self):
+        return str(self)
+
+
+class RecordingStub:
+    """Wraps a CloverStub and copies every response into a snapshot."""
+
+    def __init__(self, stub, snapshot):
+        self._stub = stub
+        self._snapshot = snapshot
+
+    def __getattr__(self, rpc):
+        method = getattr(self._stub, rpc)
+
+        def call(request, **kwargs):
+            if rpc in STREAMING_RPCS:
+                responses = list(method(request, **kwargs))
+                self._snapshot.put(rpc, request_key(request), (r.SerializeToString() for r in responses))
+                return iter(responses)
+            response = method(request, **kwargs)
+            self._snapshot.put(rpc, request_key(request), [response.SerializeToString()])
+            return response
+
+        def future(request, **kwargs):
+            pending = method.future(request, **kwargs)
+
+            def record(done):
+                if not done.cancelled() and done.exception() is None:
+                    self._snapshot.put(rpc, request_key(request), [done.result().SerializeToString()])
+
+            pending.add_done_callback(record)
+            return pending
+
+        # CallPolicy hedges unary calls through `.future`.
+        if rpc not in STREAMING_RPCS:
+            call.future = future
+        return call
+
+
+class ReplayStub:
+    """Serves Clover RPCs from a snapshot instead of the network."""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __getattr__(self, rpc):
+        message = response_class(rpc)
+
+        def call(request, **kwargs):
+            key = request_key(request)
+            payloads = self._snapshot.get(rpc, key)
+            if payloads is None:
+                raise SnapshotMiss(rpc, key)
+            responses = [message.FromString(payload) for payload in payloads]
+            if rpc in STREAMING_RPCS:
+                return iter(responses)
+            return responses[0]
+
+        def future(request, **kwargs):
+            result = Future()
+            try:
+                result.set_result(call(request, **kwargs))
+            except SnapshotMiss as e:
+                result.set_exception(e)
+            return result
+
+        if rpc not in STREAMING_RPCS:
+            call.future = future
+        return call
@@ -0,0 +1,82 @@
+import argparse
+
+REPORT_FORMATS = ('rich', 'summary', 'jsonl', 'junit', 'sarif')
+
+
+def build_parser():
+    """Command-line options shared by `validate-config` and the checker it runs."""
+    parser = argparse.ArgumentParser(
+        prog="validate-config",
+        description="Validate host_vars/structured_config changes against live network flows.",
+    )
+    parser.add_argument(
+        "positional", nargs="*", metavar="ARG",
+        help="[access_token] [host_vars_path] [intended_structured_config]",
+    )
+    parser.add_argument(
+        "--top", type=int, metavar="K",
+        help="aggregate impacts by rule/interface/VLAN and application and report only the K largest by bytes",
+    )
+    parser.add_argument(
+        "--format", choices=REPORT_FORMATS, default="rich",
+        help="report format: detailed rich output, condensed rich summary, JSON Lines, JUnit XML or SARIF",
+    )
+    parser.add_argument("--output", metavar="PATH", help="write the report to PATH instead of stdout")
+    parser.add_argument(
+        "--fail-fast", action="store_true",
+        help="stop at the first conflict and cancel outstanding flow fetches",
+    )
+    parser.add_argument("--max-findings", type=int, metavar="N", help="stop checking after N findings")
+    parser.add_argument("--timings", action="store_true", help="print a per-phase, per-host timing table to stderr")
+    parser.add_argument("--trace-file", metavar="PATH", help="write timing spans to PATH in Chrome trace format")
+    parser.add_argument("--profile", metavar="PATH", help="profile the checker and write the results to PATH")
+    parser.add_argument(
+        "--profiler", choices=("cprofile", "pyinstrument"), default="cprofile",
+        help="profiler used by --profile (default: cprofile)",
+    )
+    parser.add_argument(
+        "--record", metavar="PATH",
+        help="record CVaaS inventory and Clover responses to a snapshot file for offline runs",
+    )
+    parser.add_argument(
+        "--replay", metavar="PATH",
+        help="serve inventory and Clover responses from a recorded snapshot instead of CVaaS",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, metavar="N",
+        help="shard ACL matching for large hosts across N processes (0: one per CPU)",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and revalidate the affected hosts whenever a host_vars or structured_config file changes",
+    )
+    parser.add_argument(
+        "--no-hostnames", action="store_true",
+        help="report raw flow addresses without resolving them to hostnames",
+    )
+    parser.add_argument(
+        "--fetch-mode", choices=("connections", "tuples", "auto"), default="connections",
+        help="fetch full connection stats, only the distinct flow tuples the checks need (deduplicated by Clover), "
+             "or plan per host from its flow count and sampling rate",
+    )
+    parser.add_argument(
+        "--flow-store", metavar="PATH",
+        help="accumulate flows from incremental pulls in an SQLite store at PATH and check against it",
+    )
+    parser.add_argument(
+        "--flow-window", type=float, default=86400, metavar="SECONDS",
+        help="with --flow-store, check flows seen in the last SECONDS and prune older ones (default: 1 day)",
+    )
+    return parser
+
+
+def check_args(argv, positional):
+    """Return `argv` without the positional values, to forward to the checker."""
+    remaining = list(positional)
+    forwarded = []
+    for arg in argv:
+        if remaining and arg == remaining[0]:
+            remaining.pop(0)
+            continue
+        forwarded.append(arg)
+    return forwarded
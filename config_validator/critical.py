@@ -0,0 +1,55 @@
+"""Index of control-plane flows (BGP, BFD, OSPF, ICMP), checked before the data plane.
+
+Flows are classified by protocol and port signature once per fetched
+snapshot, and the index lists them most critical first. run_checks runs
+every candidate change against a host's index before any other check on
+that host, so the most dangerous breakages are reported before its full
+scan, which then skips the flows already covered.
+"""
+from operator import itemgetter
+
+# In priority order: losing a BGP or BFD session takes routes down with it.
+SIGNATURES = (
+    ('BGP', 6, (179,)),
+    ('BFD', 17, (3784, 3785, 4784)),
+    ('OSPF', 89, None),
+    ('ICMP', 1, None),
+)
+
+_BY_PROTOCOL = {}
+for _priority, (_name, _protocol, _ports) in enumerate(SIGNATURES):
+    _BY_PROTOCOL.setdefault(_protocol, []).append((_priority, _name, _ports and frozenset(_ports)))
+
+
+def classify(flow):
+    """Return (priority, name) for a control-plane flow, or None."""
+    for priority, name, ports in _BY_PROTOCOL.get(int(flow.get('protocol', 0)), ()):
+        if ports is None or int(flow.get('src_port', 0)) in ports or int(flow.get('dst_port', 0)) in ports:
+            return priority, name
+    return None
+
+
+def index_critical(flows):
+    """Return (priority, name, flow) for the control-plane flows in `flows`, most critical first."""
+    entries = []
+    for flow in flows:
+        signature = classify(flow)
+        if signature is not None:
+            entries.append((*signature, flow))
+    entries.sort(key=itemgetter(0))
+    return entries
+
+
+def with_critical(flows):
+    """Attach the critical index to a fetched snapshot, for callers that cache and re-screen it."""
+    if flows:
+        flows['critical'] = index_critical(flows.get('connection_stats', []))
+    return flows
+
+
+def screen_indexed(flows, prescreen):
+    """Screen a snapshot and its critical index with `prescreen`."""
+    return {
+        'connection_stats': [flow for flow in flows.get('connection_stats', []) if prescreen.may_match(flow)],
+        'critical': [entry for entry in flows.get('critical', []) if prescreen.may_match(entry[2])],
+    }
@@ -0,0 +1,130 @@
+"""`--fetch-mode auto`: plan each host's fetch from cheap GetCount/GetSamplingRate probes.
+
+A host whose candidate changes reduce to one exact server-side filter is
+always fetched filtered. Otherwise small hosts are fetched in one shot;
+large, densely sampled hosts as Clover-deduplicated tuples (repeat
+sightings of a tuple are common, so deduplication pays); and large,
+sparsely sampled hosts page by page, screening each page so only the
+flows a change can touch are held in memory. Fetches are submitted
+largest host first so the slowest one is not queued behind small ones.
+"""
+import time
+
+from config_validator import transport
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import fetch_connection_stats, get_shutdown_ports
+from config_validator.timing import span
+
+# Hosts with at most this many distinct 5-tuples are fetched in one request.
+SINGLE_SHOT_MAX = 20_000
+PAGE_SIZE = 10_000
+# Pages share one window (the API's default width) and a stable order, so offsets do not shift between them.
+PAGE_WINDOW = 300
+PAGE_ORDER = ['START', 'END']
+# 1-in-N sampling at or below this is dense enough for deduplication to pay off.
+DENSE_SAMPLING = 16
+FLOW_TUPLE = ('src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol')
+
+
+class Plan:
+    def __init__(self, host, prescreen, count=None, sampling=None):
+        self.host = host
+        self.prescreen = prescreen
+        self.count = count
+        self.sampling = sampling
+        self.strategy = self.choose()
+
+    def choose(self):
+        if self.prescreen.empty:
+            return 'skip'
+        if self.prescreen.include_criteria() is not None:
+            return 'filtered'
+        if self.count is None or self.count <= SINGLE_SHOT_MAX:
+            return 'single'
+        if self.sampling is not None and self.sampling <= DENSE_SAMPLING:
+            return 'tuples'
+        return 'paginated'
+
+    def __repr__(self):
+        return f"Plan({self.host!r}, {self.strategy}, count={self.count}, sampling=1:{self.sampling})"
+
+
+def _get(host, route, params=None):
+    response = transport.session().get(transport.url(f"/{host}/{route}"), params=params)
+    return response.json() if response.status_code == 200 else None
+
+
+def probe(host):
+    """Return (distinct 5-tuples, 1-in-N sampling rate) for `host`; None for what could not be read."""
+    count = sampling = None
+    try:
+        with span('probe', host=host):
+            counted = _get(host, 'count', {'group_by': list(FLOW_TUPLE)})
+            rates = _get(host, 'sampling_rate')
+    except Exception:
+        # A failed probe only costs the plan; the fetch itself reports errors.
+        return count, sampling
+    if counted is not None:
+        # Zero counts are omitted and uint64 values arrive as strings.
+        count = int(counted.get('count', 0))
+    rate = (rates or {}).get('max', {})
+    if rate.get('size'):
+        sampling = int(rate.get('population', 0)) // int(rate['size']) or 1
+    return count, sampling
+
+
+def plan_fetches(executor, hosts, acl_policies, interfaces_data, vlan_configs):
+    """Probe every host concurrently; return their plans, largest host first."""
+    prescreens = {
+        host: build_prescreen(acl_policies.get(host, []), get_shutdown_ports(host, interfaces_data),
+                              vlan_configs.get(host, []))
+        for host in hosts
+    }
+    probes = {host: executor.submit(probe, host) for host in hosts if not prescreens[host].empty}
+    plans = [Plan(host, prescreens[host], *(probes[host].result() if host in probes else (None, None)))
+             for host in hosts]
+    return sorted(plans, key=lambda plan: -(plan.count or 0))
+
+
+def fetch_planned(plan):
+    """Fetch `plan.host`'s flows with its strategy, keeping only those its changes can touch.
+
+    The fetch is timed as a `plan.<strategy>` span carrying the probe
+    results, so --timings and --trace-file show each host's plan.
+    """
+    with span(f'plan.{plan.strategy}', host=plan.host, count=plan.count, sampling=plan.sampling):
+        return _fetch_planned(plan)
+
+
+def _fetch_planned(plan):
+    prescreen = plan.prescreen
+    if plan.strategy == 'skip':
+        return {'connection_stats': []}
+    if plan.strategy == 'paginated':
+        flows = []
+        offset = 0
+        first = None
+        end = int(time.time() * 1000)
+        start = end - PAGE_WINDOW * 1000
+        while True:
+            batch = fetch_connection_stats(
+                plan.host, start=start, end=end, limit=PAGE_SIZE, offset=offset, sort_by=PAGE_ORDER,
+            )
+            stats = (batch or {}).get('connection_stats', [])
+            if stats and stats[0] == first:
+                break  # the server ignored the offset and sent the previous page again
+            with span('prescreen', host=plan.host):
+                flows.extend(flow for flow in stats if prescreen.may_match(flow))
+            # A short page is the last; a long one means the limit was ignored.
+            if len(stats) != PAGE_SIZE:
+                break
+            first = stats[0]
+            offset += PAGE_SIZE
+        return {'connection_stats': flows}
+    if plan.strategy == 'filtered':
+        flows = fetch_connection_stats(plan.host, prescreen.include_criteria())
+    else:
+        flows = fetch_connection_stats(plan.host, mode='tuples' if plan.strategy == 'tuples' else 'connections')
+    with span('prescreen', host=plan.host):
+        return {'connection_stats': [flow for flow in (flows or {}).get('connection_stats', [])
+                                     if prescreen.may_match(flow)]}
@@ -0,0 +1,30 @@
+"""Time-bounded cache of fetched flows, shared by --watch and the API's /validate."""
+import threading
+import time
+
+FLOW_TTL = 60.0
+
+
+class FlowCache:
+    """Flows per key (host or device), refetched once older than `ttl` seconds.
+
+    Concurrent lookups of the same key wait for a single fetch.
+    """
+
+    def __init__(self, ttl=FLOW_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def fresh(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl
+
+    def get(self, key, fetch):
+        with self.lock:
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if not self.fresh(key):
+                self.entries[key] = (time.monotonic(), fetch())
+            return self.entries[key][1]
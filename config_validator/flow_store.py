@@ -0,0 +1,173 @@
+"""On-disk store of deduplicated flow tuples, accumulated from incremental pulls.
+
+Each pull asks the API for the flows seen since the previous pull of that
+device, so a store refreshed every few minutes (by repeated runs, a cron
+job or --watch) covers hours or days of traffic while each fetch stays a
+few minutes wide. Flows are keyed on their 5-tuple plus interfaces; a
+repeat sighting bumps last_seen and the byte and packet totals. Checks
+read back only the rows a candidate change can touch, through indexed
+lookups on the prescreen's keys.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+# Width of one pull, matching the API's default window. The first pull of
+# a device covers one window; a catch-up after a gap is split into windows.
+PULL_WINDOW = 300
+# Stored flows older than this many seconds are ignored and pruned.
+DEFAULT_WINDOW = 24 * 3600
+
+TUPLE_FIELDS = ('src_ip', 'dst_ip', 'src_port', 'dst_port', 'protocol', 'ingress_interface', 'egress_interface')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flows (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    src_ip TEXT NOT NULL,
+    dst_ip TEXT NOT NULL,
+    src_port INTEGER NOT NULL,
+    dst_port INTEGER NOT NULL,
+    protocol INTEGER NOT NULL,
+    ingress_interface TEXT NOT NULL,
+    egress_interface TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    packets INTEGER NOT NULL,
+    flow TEXT NOT NULL,
+    UNIQUE (device, src_ip, dst_ip, src_port, dst_port, protocol, ingress_interface, egress_interface)
+);
+CREATE INDEX IF NOT EXISTS flows_ingress ON flows (device, ingress_interface);
+CREATE INDEX IF NOT EXISTS flows_egress ON flows (device, egress_interface);
+CREATE INDEX IF NOT EXISTS flows_src_ip ON flows (device, src_ip);
+CREATE INDEX IF NOT EXISTS flows_dst_ip ON flows (device, dst_ip);
+CREATE INDEX IF NOT EXISTS flows_src_port ON flows (device, src_port);
+CREATE INDEX IF NOT EXISTS flows_dst_port ON flows (device, dst_port);
+CREATE INDEX IF NOT EXISTS flows_protocol ON flows (device, protocol);
+CREATE INDEX IF NOT EXISTS flows_last_seen ON flows (last_seen);
+CREATE TABLE IF NOT EXISTS pulls (
+    device TEXT PRIMARY KEY,
+    last_end INTEGER NOT NULL
+);
+"""
+
+UPSERT = """
+INSERT INTO flows (device, src_ip, dst_ip, src_port, dst_port, protocol, ingress_interface, egress_interface,
+                   first_seen, last_seen, bytes, packets, flow)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (device, src_ip, dst_ip, src_port, dst_port, protocol, ingress_interface, egress_interface)
+DO UPDATE SET last_seen = excluded.last_seen, bytes = bytes + excluded.bytes,
+              packets = packets + excluded.packets, flow = excluded.flow
+"""
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def _row(device, flow, seen):
+    # MessageToDict omits zero values and renders 64-bit integers as strings.
+    return (
+        device,
+        flow.get('src_ip', ''),
+        flow.get('dst_ip', ''),
+        int(flow.get('src_port', 0)),
+        int(flow.get('dst_port', 0)),
+        int(flow.get('protocol', 0)),
+        flow.get('ingress_interface', ''),
+        flow.get('egress_interface', ''),
+        seen,
+        seen,
+        int(flow.get('bytes') or 0),
+        int(flow.get('packets') or 0),
+        json.dumps(flow, separators=(',', ':')),
+    )
+
+
+class FlowStore:
+    """SQLite flow store shared by the fetch threads of one run.
+
+    WAL mode lets a cron pull and an interactive run use the same file.
+    """
+
+    def __init__(self, path, window=DEFAULT_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def since(self):
+        return now_ms() - int(self.window * 1000)
+
+    def last_pull(self, device):
+        with self.lock:
+            row = self.db.execute("SELECT last_end FROM pulls WHERE device = ?", (device,)).fetchone()
+        return row[0] if row else None
+
+    def pull(self, device, fetch):
+        """Fetch `device`'s flows since its last pull with `fetch(start, end)` and merge them in.
+
+        The span is fetched PULL_WINDOW seconds at a time, and each window is
+        committed on its own, so an interrupted catch-up resumes where it
+        stopped. Returns the number of flows fetched.
+        """
+        end = now_ms()
+        start = max(self.last_pull(device) or end - PULL_WINDOW * 1000, self.since())
+        fetched = 0
+        while start < end:
+            stop = min(start + PULL_WINDOW * 1000, end)
+            flows = fetch(start, stop) or {}
+            rows = [_row(device, flow, stop) for flow in flows.get('connection_stats', [])]
+            with self.lock, self.db:
+                self.db.executemany(UPSERT, rows)
+                self.db.execute(
+                    "INSERT INTO pulls (device, last_end) VALUES (?, ?)"
+                    " ON CONFLICT (device) DO UPDATE SET last_end = excluded.last_end",
+                    (device, stop),
+                )
+            fetched += len(rows)
+            start = stop
+        return fetched
+
+    def prune(self):
+        """Drop flows not seen within the window; return how many were removed."""
+        with self.lock, self.db:
+            return self.db.execute("DELETE FROM flows WHERE last_seen < ?", (self.since(),)).rowcount
+
+    def flows(self, device, prescreen):
+        """Return the device's stored flows that `prescreen` may match, in first-seen order."""
+        if prescreen.empty:
+            return {'connection_stats': []}
+        keys = prescreen.index_keys()
+        since = self.since()
+        if keys is None:
+            # Ranges and wide prefixes have no exact keys: read the device's rows and screen them.
+            query, params = "SELECT id, flow, bytes, packets FROM flows WHERE device = ? AND last_seen >= ?", [
+                device, since,
+            ]
+        else:
+            # One indexed lookup per key column; UNION drops flows found by several.
+            query = " UNION ".join(
+                f"SELECT id, flow, bytes, packets FROM flows WHERE device = ? AND last_seen >= ?"
+                f" AND {column} IN (SELECT value FROM json_each(?))"
+                for column, _ in keys
+            )
+            params = [value for column, values in keys for value in (device, since, json.dumps(sorted(values)))]
+        with self.lock:
+            rows = self.db.execute(f"{query} ORDER BY id", params).fetchall()
+        flows = []
+        for _, flow, total_bytes, total_packets in rows:
+            flow = json.loads(flow)
+            flow['bytes'] = total_bytes
+            flow['packets'] = total_packets
+            if keys is not None or prescreen.may_match(flow):
+                flows.append(flow)
+        return {'connection_stats': flows}
@@ -0,0 +1,105 @@
+"""Resolve the endpoints of reported flows to hostnames, in batches and with a cache.
+
+Names come, in order, from the cache file, from the src/dst_hostnames that
+ConnectionStats already carries, and from one GetHostnames call per device
+with unresolved findings. Resolved and unresolvable addresses alike are
+cached for HOSTNAME_TTL seconds, so repeated runs rarely call Clover.
+"""
+import json
+import os
+import time
+
+from config_validator import transport
+from config_validator.timing import span
+
+HOSTNAME_TTL = 24 * 3600
+CACHE_FILE = os.path.join(os.path.expanduser("~/.config/config_validator"), "hostnames.json")
+
+
+class HostnameCache:
+    """{ip: (hostname, resolved at)} persisted as JSON; "" marks an address with no known name."""
+
+    def __init__(self, path=CACHE_FILE, ttl=HOSTNAME_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path) as f:
+                self.entries = {ip: tuple(entry) for ip, entry in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+
+    def get(self, ip):
+        """Return the cached name ("" if unknown), or None when `ip` must be resolved."""
+        entry = self.entries.get(ip)
+        if entry is None or time.time() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def put(self, ip, hostname):
+        self.entries[ip] = (hostname, time.time())
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        now = time.time()
+        entries = {ip: entry for ip, entry in self.entries.items() if now - entry[1] <= self.ttl}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def fetch_hostnames(host):
+    """Return {ip: hostname} for every endpoint `host` knows from one GetHostnames call; None on failure."""
+    try:
+        with span('hostnames', host=host):
+            response = transport.session().get(transport.url(f"/{host}/hostnames"))
+    except Exception:
+        return None
+    if response.status_code != 200:
+        return None
+    return {entry['ip']: entry['hostname'] for entry in response.json().get('hosts', [])
+            if entry.get('ip') and entry.get('hostname')}
+
+
+def resolve_hostnames(findings, cache, executor=None):
+    """Set `src_hostname`/`dst_hostname` on the flows of `findings` where a name is known."""
+    pending = {}
+    for finding in findings:
+        flow = finding.get('flow')
+        if not flow:
+            continue
+        for side in ('src', 'dst'):
+            ip = flow.get(f'{side}_ip')
+            if not ip or cache.get(ip) is not None:
+                continue
+            embedded = flow.get(f'{side}_hostnames')
+            if embedded:
+                cache.put(ip, embedded[0])
+            else:
+                pending.setdefault(finding['host'], set()).add(ip)
+
+    if pending:
+        hosts = sorted(pending)
+        results = executor.map(fetch_hostnames, hosts) if executor is not None else map(fetch_hostnames, hosts)
+        for host, names in zip(hosts, results):
+            if names is None:
+                continue  # names are cosmetic: leave raw addresses and retry next run
+            for ip in pending[host]:
+                if cache.get(ip) is None:
+                    cache.put(ip, names.get(ip, ""))
+
+    for finding in findings:
+        flow = finding.get('flow')
+        if not flow:
+            continue
+        for side in ('src', 'dst'):
+            hostname = cache.get(flow.get(f'{side}_ip'))
+            if hostname:
+                flow[f'{side}_hostname'] = hostname
+    cache.save()
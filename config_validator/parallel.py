@@ -0,0 +1,74 @@
+"""Shard ACL matching for large hosts across a process pool.
+
+Workers receive the compiled ACLs and the host's flow list once, through
+the pool initializer: with the fork start method that is a copy-on-write
+inheritance rather than a pickle. Tasks are just (start, end) ranges and
+results are (flow, ACL, entry) index triples, so little crosses process
+boundaries. Shards are merged in range order, which reproduces the
+sequential flow-major, ACL-order output exactly.
+
+Forking a process whose other threads may hold locks (an HTTP connection
+pool, logging) can deadlock the child, so callers must have no thread
+mid-request when they shard; run_checks waits for all of its fetches
+first.
+"""
+import os
+
+# Below this many flow x ACL-entry pairs, forking costs more than it saves.
+MIN_PARALLEL_WORK = 500_000
+SHARDS_PER_WORKER = 4
+
+_job = None
+
+
+def resolve_jobs(jobs):
+    """`jobs` <= 0 means one worker per CPU."""
+    return jobs if jobs and jobs > 0 else os.cpu_count() or 1
+
+
+def worth_sharding(compiled, flows, jobs):
+    work = len(flows) * sum(len(compiled_acl.entries) for _, compiled_acl in compiled)
+    return jobs > 1 and work >= MIN_PARALLEL_WORK
+
+
+def _init_worker(compiled, flows):
+    global _job
+    _job = (compiled, flows)
+
+
+def _match_shard(bounds):
+    compiled, flows = _job
+    hits = []
+    for flow_index in range(*bounds):
+        flow = flows[flow_index]
+        for acl_index, (_, compiled_acl) in enumerate(compiled):
+            entry_index = compiled_acl.match_index(flow)
+            if entry_index >= 0 and compiled_acl.entries[entry_index].get('action') == 'deny':
+                hits.append((flow_index, acl_index, entry_index))
+    return hits
+
+
+def _context():
+    import multiprocessing
+
+    # fork shares the parent's compiled ACLs and flows without pickling them.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def sharded_denies(compiled, flows, jobs):
+    """Yield (flow index, ACL index, entry index) for every denied flow, in sequential order."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    shard_size = -(-len(flows) // (jobs * SHARDS_PER_WORKER))
+    bounds = [(start, min(start + shard_size, len(flows))) for start in range(0, len(flows), shard_size)]
+    executor = ProcessPoolExecutor(
+        max_workers=jobs, mp_context=_context(), initializer=_init_worker, initargs=(compiled, flows),
+    )
+    try:
+        for hits in executor.map(_match_shard, bounds):
+            yield from hits
+    finally:
+        # A consumer that stops early (--fail-fast) drops the remaining shards.
+        executor.shutdown(cancel_futures=True)
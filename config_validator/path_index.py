@@ -0,0 +1,33 @@
+"""Fabric-wide index of INT flow paths keyed by (device, interface)."""
+
+
+def _node_device(node):
+    return (node.get('hostname') or node.get('device_id') or '').lower()
+
+
+def build_path_index(flows):
+    """Map every (device, interface) seen on a flow's path to the flows transiting it."""
+    index = {}
+    for flow in flows:
+        for node in flow.get('path', {}).get('nodes', []):
+            device = _node_device(node)
+            ingress = node.get('ingress_interface')
+            egress = node.get('egress_interface')
+            if ingress:
+                index.setdefault((device, ingress), []).append(flow)
+            if egress and egress != ingress:
+                index.setdefault((device, egress), []).append(flow)
+    return index
+
+
+def flows_through(index, device, interfaces):
+    """Return the distinct flows crossing any of `interfaces` on `device`."""
+    device = device.lower()
+    seen = set()
+    flows = []
+    for interface in interfaces:
+        for flow in index.get((device, interface), []):
+            if id(flow) not in seen:
+                seen.add(id(flow))
+                flows.append(flow)
+    return flows
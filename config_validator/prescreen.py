@@ -0,0 +1,157 @@
+"""Cheap pre-screen that drops flows no candidate change can touch.
+
+Every deny entry, shut interface and SVI address of a host contributes a
+key to one of a few hash sets. A flow that hits none of them cannot be
+impacted, so only the hits go on to the full matchers. A flow blocked by
+an ACL must match every field of its deny entry, so keying each entry on a
+single constrained field is enough to keep the screen exact.
+"""
+from config_validator.acl import IntervalField, PrefixField, as_list, parse_address, parse_ports, parse_protocol
+
+# Ranges wider than this are poor screening keys; prefer another field.
+WIDE_PORT_RANGE = 1024
+
+
+class Prescreen:
+    def __init__(self):
+        self.match_all = False
+        self.source = PrefixField()
+        self.destination = PrefixField()
+        self.source_ports = IntervalField()
+        self.destination_ports = IntervalField()
+        self.protocols = set()
+        self.interfaces = set()
+        self.endpoint_ips = set()
+        # Exact keys per FlowFilter.Criteria field, for the server-side filter.
+        self.criteria = {}
+
+    def _add_criteria(self, field, values):
+        if field in self.criteria and self.criteria[field] is None:
+            return
+        self.criteria.setdefault(field, set()).update(values)
+
+    def add_acl_entry(self, entry):
+        if entry.get('action') != 'deny':
+            return
+        try:
+            protocol = parse_protocol(entry.get('protocol'))
+            source = [parse_address(value) for value in as_list(entry.get('source'))]
+            destination = [parse_address(value) for value in as_list(entry.get('destination'))]
+            source_ports = parse_ports(entry.get('source_ports'), entry.get('source_ports_match'))
+            destination_ports = parse_ports(entry.get('destination_ports'), entry.get('destination_ports_match'))
+        except ValueError:
+            # The ACL compiler never matches entries it cannot parse.
+            return
+
+        for networks, field, criteria in ((destination, self.destination, 'dst_ips'),
+                                          (source, self.source, 'src_ips')):
+            if networks and None not in networks and all(network.prefixlen >= 8 for network in networks):
+                field.add(1, networks)
+                if all(network.num_addresses == 1 for network in networks):
+                    self._add_criteria(criteria, (str(network.network_address) for network in networks))
+                else:
+                    self.criteria[criteria] = None
+                return
+        for intervals, field, criteria in ((destination_ports, self.destination_ports, 'dst_ports'),
+                                           (source_ports, self.source_ports, 'src_ports')):
+            if intervals and sum(high - low + 1 for low, high in intervals) <= WIDE_PORT_RANGE:
+                field.add(1, intervals)
+                self._add_criteria(criteria, (port for low, high in intervals for port in range(low, high + 1)))
+                return
+        if protocol is not None:
+            self.protocols.add(protocol)
+            self._add_criteria('protocols', [protocol])
+            return
+        self.match_all = True
+
+    def add_interfaces(self, interfaces):
+        if interfaces:
+            self.interfaces.update(interfaces)
+            self._add_criteria('interfaces', interfaces)
+
+    def add_vlan(self, vlan):
+        ip_subnet = vlan.get('ip_address', '')
+        if ip_subnet:
+            self.endpoint_ips.add(ip_subnet.split('/')[0])
+            # Matches either direction, which a single Criteria field cannot express.
+            self.criteria['endpoint_ips'] = None
+
+    def build(self):
+        self.source_ports.build()
+        self.destination_ports.build()
+        return self
+
+    @property
+    def empty(self):
+        return not self.match_all and not self.criteria
+
+    def may_match(self, flow):
+        """Return True if some candidate change could impact `flow`."""
+        if self.match_all:
+            return True
+        return bool(
+            flow.get('ingress_interface') in self.interfaces
+            or flow.get('egress_interface') in self.interfaces
+            or flow.get('src_ip') in self.endpoint_ips
+            or flow.get('dst_ip') in self.endpoint_ips
+            or flow.get('protocol', 0) in self.protocols
+            or self.destination.lookup(flow.get('dst_ip'))
+            or self.source.lookup(flow.get('src_ip'))
+            or self.destination_ports.lookup(flow.get('dst_port', 0))
+            or self.source_ports.lookup(flow.get('src_port', 0))
+        )
+
+    def include_criteria(self):
+        """Return FlowFilter.include fields equivalent to this screen, or None.
+
+        Criteria fields are ANDed by the server, so a filter is only produced
+        when every key lives in a single exact-valued field.
+        """
+        if self.match_all or len(self.criteria) != 1:
+            return None
+        field, values = next(iter(self.criteria.items()))
+        if values is None:
+            return None
+        return {field: sorted(values)}
+
+    def index_keys(self):
+        """Return (flow field, exact values) pairs covering this screen, or None.
+
+        A flow matches the screen iff one of its fields holds one of the
+        paired values, so a flow store can answer it with indexed lookups.
+        None means some key is a prefix or wide range.
+        """
+        if self.match_all:
+            return None
+        keys = []
+        for field, values in self.criteria.items():
+            if field == 'endpoint_ips':
+                continue
+            if values is None:
+                return None
+            keys.extend((column, values) for column in INDEX_COLUMNS[field])
+        if self.endpoint_ips:
+            keys.extend((column, self.endpoint_ips) for column in ('src_ip', 'dst_ip'))
+        return keys
+
+
+# Flow fields matched by each FlowFilter.Criteria field.
+INDEX_COLUMNS = {
+    'interfaces': ('ingress_interface', 'egress_interface'),
+    'src_ips': ('src_ip',),
+    'dst_ips': ('dst_ip',),
+    'src_ports': ('src_port',),
+    'dst_ports': ('dst_port',),
+    'protocols': ('protocol',),
+}
+
+
+def build_prescreen(acls, shutdown_ports, vlans):
+    prescreen = Prescreen()
+    for acl in acls:
+        for entry in acl.get('entries', []):
+            prescreen.add_acl_entry(entry)
+    prescreen.add_interfaces(shutdown_ports)
+    for vlan in vlans:
+        prescreen.add_vlan(vlan)
+    return prescreen.build()
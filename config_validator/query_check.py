@@ -1,13 +1,33 @@
 import os
-import yaml
-import requests
+import sys
 import json
-from rich import print
+
+from config_validator import transport
+from config_validator.acl import compile_acl
+from config_validator.cli import build_parser
+from config_validator.critical import index_critical
+from config_validator.parallel import resolve_jobs, sharded_denies, worth_sharding
+from config_validator.path_index import build_path_index, flows_through
+from config_validator.prescreen import build_prescreen
+from config_validator.timing import parse_server_timing, profiled, span, tracer
+from config_validator.report import (
+    FindingLimitReached, Report, acl_finding, describe, shutdown_finding, vlan_finding, write_report,
+)
 
 config_dir = os.path.expanduser("~/.config/config_validator")
-print("config", config_dir)
 METADATA_FILE = os.path.join(config_dir, "metadata.json")
 PROTOCOLS = {1: "ICMP", 6: "TCP", 17: "UDP"}
+FETCH_WORKERS = 8
+# API route per --fetch-mode: full connection stats, or Clover-deduplicated tuples.
+FETCH_ROUTES = {'connections': 'connection_stats', 'tuples': 'flow_tuples'}
+# Findings quoted per protocol in a critical alert.
+ALERT_EXAMPLES = 3
+
+
+def print_error(message):
+    from rich import print
+
+    print(f"[red]{message}[/red]", file=sys.stderr)
 
 
 def load_metadata():
@@ -17,29 +37,133 @@ def load_metadata():
     return {}
 
 
-def fetch_connection_stats(host):
-    url = f"http://127.0.0.1:8000/{host}/connection_stats"
+def alert_critical(host, findings):
+    """Summarise a host's control-plane breakages on stderr as soon as they are found.
+
+    Prints one line per protocol, with the first ALERT_EXAMPLES findings;
+    the report carries the rest.
+    """
+    from rich.markup import escape
+
+    by_protocol = {}
+    for finding in findings:
+        by_protocol.setdefault(finding['critical'], []).append(finding)
+    for name, group in by_protocol.items():
+        examples = '; '.join(describe({**finding, 'critical': None}) for finding in group[:ALERT_EXAMPLES])
+        more = f" (+{len(group) - ALERT_EXAMPLES} more)" if len(group) > ALERT_EXAMPLES else ""
+        impacts = 'impact' if len(group) == 1 else 'impacts'
+        print_error(escape(f"CRITICAL {name} on {host}: {len(group)} {impacts}: {examples}{more}"))
+
+
+def critical_alert(args):
+    """Return the critical-flow alert for this run, or None when stderr lines would only add noise.
+
+    Machine-readable formats and --top runs get the findings from the report alone.
+    """
+    if args.format in ('rich', 'summary') and not args.top:
+        return alert_critical
+    return None
+
+
+class FetchError(Exception):
+    """Flows for a host could not be fetched; the run must not pass silently."""
+
+
+def fetch_connection_stats(host, include=None, start=None, end=None, mode='connections', limit=None, offset=0,
+                           sort_by=None):
+    params = dict(include or {})
+    if start is not None:
+        params.update(start=start, end=end)
+    if limit:
+        params.update(limit=limit, offset=offset, sort_by=sort_by)
     try:
-        response = requests.get(url)
+        with span('fetch', host=host) as record:
+            response = transport.session().get(transport.url(f"/{host}/{FETCH_ROUTES[mode]}"), params=params)
+            for name, duration in parse_server_timing(response.headers.get('Server-Timing')):
+                tracer.add(f'server.{name}', record['start'], duration)
+    except Exception as e:
+        raise FetchError(f"Error fetching connection stats for host {host}: {e}") from e
+    if response.status_code != 200:
+        raise FetchError(f"Failed to retrieve flows for {host}, Status: {response.status_code} {response.text}")
+    with span('decode', host=host):
+        return response.json()
+
+
+def fetch_fabric_connection_stats():
+    """Fetch fabric-wide INT flows; on failure, warn and fall back to device-local checks."""
+    try:
+        response = transport.session().get(transport.url("/fabric/connection_stats"))
         if response.status_code == 200:
             return response.json()
         else:
-            print(f"[red]Failed to retrieve flows for {host}, Status: {response.status_code}[/red]")
+            print_error(f"Failed to retrieve fabric flows, Status: {response.status_code}")
     except Exception as e:
-        print(f"[red]Error fetching connection stats for host {host}: {e}[/red]")
+        print_error(f"Error fetching fabric connection stats: {e}")
     return None
 
 
+def fetch_screened_flows(host, acls, shutdown_ports, vlans, mode='connections'):
+    """Fetch a host's flows once, keeping only those a candidate change can touch."""
+    prescreen = build_prescreen(acls, shutdown_ports, vlans)
+    if prescreen.empty:
+        return {'connection_stats': []}
+    flows = fetch_connection_stats(host, prescreen.include_criteria(), mode=mode)
+    if not flows:
+        return {'connection_stats': []}
+    with span('prescreen', host=host):
+        flows['connection_stats'] = [flow for flow in flows.get('connection_stats', []) if prescreen.may_match(flow)]
+    return flows
+
+
+def fetch_mode(args):
+    """--fetch-mode for a single host fetch: `auto` only plans full runs."""
+    return 'connections' if args.fetch_mode == 'auto' else args.fetch_mode
+
+
+def pull_stored_flows(store, host, mode='connections'):
+    """Merge the host's flows since its last pull into `store`."""
+    return store.pull(host, lambda start, end: fetch_connection_stats(host, start=start, end=end, mode=mode))
+
+
+def stored_screened_flows(store, host, acls, shutdown_ports, vlans, mode='connections'):
+    """Pull a host's new flows into `store`, then read back those a candidate change can touch."""
+    prescreen = build_prescreen(acls, shutdown_ports, vlans)
+    pull_stored_flows(store, host, mode)
+    with span('store', host=host):
+        return store.flows(host, prescreen)
+
+
+def is_yaml(file_name):
+    return file_name.endswith('.yaml') or file_name.endswith('.yml')
+
+
+def host_name(file_name):
+    return os.path.basename(file_name).split('.')[0]
+
+
+def read_yaml_file(path):
+    import yaml
+
+    # libyaml's loader is several times faster when PyYAML was built with it.
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)) or {}
+
+
+def interface_config(data):
+    return {
+        'port_channel_interfaces': data.get('port_channel_interfaces', []),
+        'ethernet_interfaces': data.get('ethernet_interfaces', [])
+    }
+
+
 def read_yaml_configs(directory, key):
     data = {}
     if not directory or not os.path.exists(directory):
         return data
     for file_name in os.listdir(directory):
-        if file_name.endswith('.yaml') or file_name.endswith('.yml'):
-            with open(os.path.join(directory, file_name), 'r') as f:
-                yaml_data = yaml.safe_load(f) or {}
-                host_name = file_name.split('.')[0]
-                data[host_name] = yaml_data.get(key, [])
+        if is_yaml(file_name):
+            yaml_data = read_yaml_file(os.path.join(directory, file_name))
+            data[host_name(file_name)] = yaml_data.get(key, [])
     return data
 
 
@@ -48,50 +172,57 @@ def read_interface_data(directory):
     if not directory or not os.path.exists(directory):
         return interfaces_data
     for file_name in os.listdir(directory):
-        if file_name.endswith('.yaml') or file_name.endswith('.yml'):
-            full_path = os.path.join(directory, file_name)
-            with open(full_path, 'r') as file:
-                data = yaml.safe_load(file) or {}
-                host_name = file_name.split('.')[0]
-                interfaces_data[host_name] = {
-                    'port_channel_interfaces': data.get('port_channel_interfaces', []),
-                    'ethernet_interfaces': data.get('ethernet_interfaces', [])
-                }
+        if is_yaml(file_name):
+            data = read_yaml_file(os.path.join(directory, file_name))
+            interfaces_data[host_name(file_name)] = interface_config(data)
     return interfaces_data
 
 
-def is_flow_blocked(flow, acl_entry, protocol_name):
-    if acl_entry.get('action') != 'deny':
-        return False
-    acl_protocol = acl_entry.get('protocol', '').upper()
-    if acl_protocol and acl_protocol != protocol_name:
-        return False
-    return any([
-        flow.get('src_port') in acl_entry.get('source_ports', []),
-        flow.get('dst_port') in acl_entry.get('destination_ports', []),
-        flow.get('src_ip') in acl_entry.get('source', []),
-        flow.get('dst_ip') in acl_entry.get('destination', [])
-    ])
+def flow_key(flow):
+    return (flow.get('src_ip'), flow.get('dst_ip'), flow.get('src_port'), flow.get('dst_port'), flow.get('protocol'))
 
 
-def check_flows_against_acls(host, acls):
-    flows = fetch_connection_stats(host)
+def check_flows_against_acls(host, acls, flows=None):
+    if flows is None:
+        flows = fetch_connection_stats(host)
     if not flows:
         return []
-    blocked_flows = []
-    for flow in flows.get('connection_stats', []):
+    return list(iter_blocked_flows(acls, flows))
+
+
+def iter_blocked_flows(acls, flows, jobs=1, before_fork=None):
+    """Yield (acl, entry, flow, protocol name, app_service_name) for every denied flow.
+
+    Large hosts are sharded across `jobs` forked processes; `before_fork`
+    is called first, so the caller can quiesce its other threads.
+    """
+    compiled = [(acl, compile_acl(acl)) for acl in acls]
+    connection_stats = flows.get('connection_stats', [])
+    if worth_sharding(compiled, connection_stats, jobs):
+        if before_fork is not None:
+            before_fork()
+        denies = (
+            (connection_stats[flow_index], compiled[acl_index][0], compiled[acl_index][1].entries[entry_index])
+            for flow_index, acl_index, entry_index in sharded_denies(compiled, connection_stats, jobs)
+        )
+    else:
+        denies = _denies(compiled, connection_stats)
+    for flow, acl, entry in denies:
         protocol_name = PROTOCOLS.get(flow.get('protocol'), f"Unknown({flow.get('protocol')})")
-        for acl in acls:
-            for entry in acl.get('entries', []):
-                if is_flow_blocked(flow, entry, protocol_name):
-                    for app in flow.get('applications', []):
-                        blocked_flows.append((acl, entry, flow, protocol_name, app.get('app_service_name', 'unknown')))
-    return blocked_flows
+        for app in flow.get('applications', []):
+            yield acl, entry, flow, protocol_name, app.get('app_service_name', 'unknown')
 
 
-def check_shutdown_impact(host, interfaces_data):
+def _denies(compiled, connection_stats):
+    for flow in connection_stats:
+        for acl, compiled_acl in compiled:
+            entry = compiled_acl.match(flow)
+            if entry is not None and entry.get('action') == 'deny':
+                yield flow, acl, entry
+
+
+def get_shutdown_ports(host, interfaces_data):
     shutdown_ports = []
-    shutdown_affected_flows = []
     port_channels = interfaces_data.get(host, {}).get('port_channel_interfaces', [])
     ethernet_interfaces = interfaces_data.get(host, {}).get('ethernet_interfaces', [])
 
@@ -102,22 +233,48 @@ def check_shutdown_impact(host, interfaces_data):
     for eth in ethernet_interfaces:
         if eth.get('shutdown', False):
             shutdown_ports.append(eth.get('name', 'unknown'))
+    return shutdown_ports
+
+
+def check_shutdown_impact(host, interfaces_data, path_index=None, flows=None):
+    shutdown_ports = get_shutdown_ports(host, interfaces_data)
+    if not shutdown_ports:
+        return [], shutdown_ports
+    if flows is None:
+        flows = fetch_connection_stats(host)
+    return list(iter_shutdown_affected(host, shutdown_ports, flows, path_index)), shutdown_ports
+
 
-    flows = fetch_connection_stats(host)
+def iter_shutdown_affected(host, shutdown_ports, flows, path_index=None):
+    affected = []
     if flows:
         for flow in flows.get('connection_stats', []):
             if flow.get('ingress_interface') in shutdown_ports or flow.get('egress_interface') in shutdown_ports:
-                for app in flow.get('applications', []):
-                    shutdown_affected_flows.append((flow, app.get('app_service_name', 'unknown')))
-    return shutdown_affected_flows, shutdown_ports
+                affected.append(flow)
+
+    # Flows reported by other devices whose INT path transits the shut ports.
+    if path_index:
+        seen = {flow_key(flow) for flow in affected}
+        for flow in flows_through(path_index, host, shutdown_ports):
+            key = flow_key(flow)
+            if key not in seen:
+                seen.add(key)
+                affected.append(flow)
+
+    for flow in affected:
+        for app in flow.get('applications', []):
+            yield flow, app.get('app_service_name', 'unknown')
 
 
-def analyze_vlan_impact(host, vlan_list):
-    flows = fetch_connection_stats(host)
+def analyze_vlan_impact(host, vlan_list, flows=None):
+    if flows is None:
+        flows = fetch_connection_stats(host)
     if not flows:
         return []
+    return list(iter_vlan_impacts(vlan_list, flows))
 
-    affected = []
+
+def iter_vlan_impacts(vlan_list, flows):
     for vlan in vlan_list:
         vlan_name = vlan.get('name')
         shutdown = vlan.get('shutdown', False)
@@ -140,95 +297,238 @@ def analyze_vlan_impact(host, vlan_list):
                     if not shutdown:
                         impact['access_in'] = access_in
                         impact['access_out'] = access_out
-                    affected.append(impact)
-
-    return affected
-
-
-def main():
-    metadata = load_metadata()
-    acls_config_dir = metadata.get("host_vars_path")
-    intended_config_dir = metadata.get("intended_config_path")
-    acl_policies = read_yaml_configs(acls_config_dir, 'ip_access_lists')
-    interfaces_data = read_interface_data(intended_config_dir)
-    vlan_configs = read_yaml_configs(intended_config_dir, 'vlan_interfaces')
-
-    conflict = {
-        'Acl': False,
-        'Interface': False,
-        'Vlan': False
-    }
+                    yield impact
+
+
+def check_critical(report, host, flows, acls, shutdown_ports, vlans, alert=None):
+    """Check the host's control-plane flows against its candidate changes, most critical first.
+
+    Returns the ids of the flows checked, for the full scan to skip.
+    """
+    entries = (flows or {}).get('critical')
+    if entries is None:
+        entries = index_critical((flows or {}).get('connection_stats', []))
+    if not entries:
+        return set()
+    names = {id(flow): (priority, name) for priority, name, flow in entries}
+    critical = {'connection_stats': [flow for _, _, flow in entries]}
+    findings = []
+    for acl, entry, flow, protocol, app_service_name in iter_blocked_flows(acls, critical):
+        findings.append((flow, acl_finding(host, acl, entry, flow, protocol, app_service_name)))
+    if shutdown_ports:
+        for flow, app_service_name in iter_shutdown_affected(host, shutdown_ports, critical):
+            findings.append((flow, shutdown_finding(host, flow, app_service_name, shutdown_ports)))
+    for impact in iter_vlan_impacts(vlans, critical):
+        findings.append((impact['flow'], vlan_finding(host, impact)))
+    findings.sort(key=lambda item: names[id(item[0])][0])
+    added = []
+    try:
+        for flow, finding in findings:
+            finding['critical'] = names[id(flow)][1]
+            # Register the host first, so a finding that hits the limit still shows up in the report.
+            if finding['check'] == 'Interface':
+                report.host_checked('Interface', host, shutdown_ports=shutdown_ports)
+            else:
+                report.host_checked(finding['check'], host)
+            added.append(finding)
+            report.add(finding)
+    finally:
+        if alert is not None and added:
+            alert(host, added)
+    return set(names)
+
+
+def warn_skipped_entries(report, host, acls):
+    """Warn about ACL entries the classifier had to leave out; flows they match are judged without them."""
+    for acl in acls:
+        for entry, reason in compile_acl(acl).skipped:
+            sequence = entry.get('sequence', '-')
+            report.warn('Acl', host, f'ACL "{acl.get("name", "unknown")}" sequence {sequence} could not be parsed'
+                                     f' and was ignored: {reason}')
+
+
+def run_checks(report, acl_policies, interfaces_data, vlan_configs, host_flows, fabric_flows=None, jobs=1,
+               alert=None):
+    """Run the ACL, shutdown and VLAN checks, adding every impact to `report`.
+
+    `host_flows` maps each host to a future of its screened flows. The
+    full scans run host by host in config order. Control-plane flows are
+    checked in arrival order instead: before each scan, and while a scan
+    waits for its host's flows, every host whose flows have arrived gets
+    its critical pass and the result is passed to `alert(host, findings)`.
+    The full scans then skip those flows. With `jobs` > 1, ACL matching
+    for large hosts is sharded across forked processes, once every fetch
+    has finished.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    critical = {}
+    pending = {future: host for host, future in host_flows.items()}
+    for host, acls in acl_policies.items():
+        warn_skipped_entries(report, host, acls)
+
+    def check_arrived(host):
+        """Run the critical pass of every host whose flows are in, until `host`'s are."""
+        while True:
+            for future in [future for future in pending if future.done()]:
+                arrived = pending.pop(future)
+                with span('check.critical', host=arrived):
+                    critical[arrived] = check_critical(
+                        report, arrived, future.result(), acl_policies.get(arrived, []),
+                        get_shutdown_ports(arrived, interfaces_data), vlan_configs.get(arrived, []), alert,
+                    )
+            if host in critical:
+                return
+            with span('wait', host=host):
+                wait(pending, return_when=FIRST_COMPLETED)
+
+    def checked_flows(host):
+        check_arrived(host)
+        return host_flows[host].result(), critical[host]
+
+    fabric_future = fabric_flows
+
+    def join_fetches():
+        """Wait for every fetch, so no fetch thread is mid-request (holding locks) when workers fork."""
+        while pending:
+            check_arrived(next(iter(pending.values())))
+        if fabric_future is not None:
+            with span('wait', host='fabric'):
+                wait([fabric_future])
 
-    print("\n[bold underline]Checking ACL Blocked Flows[/bold underline]")
     for host, acls in acl_policies.items():
-        blocked_flows = check_flows_against_acls(host, acls)
-        print(f"\nHost: [bold]{host}[/bold]")
-        if not blocked_flows:
-            print("[bold green]No protocol conflicts found for this host[/bold green]")
-            continue
-        for acl, entry, flow, protocol, app_service_name in blocked_flows:
-            print(f'[bold red]WARNING: ACL "{acl.get("name", "unknown")}" blocks protocol {protocol}[/bold red]')
-            print(f"\tFlow: {flow.get('src_ip')}:{flow.get('src_port')} -> {flow.get('dst_ip')}:{flow.get('dst_port')}")
-            print(f"\tBlocked Ports: SRC {entry.get('source_ports', [])} -> DST {entry.get('destination_ports', [])}")
-            print(f"\tInterface: {flow.get('ingress_interface')} -> {flow.get('egress_interface')}")
-            app_name_split = app_service_name[37:].split("-")
-            app_name = app_name_split[0] + ":" + "-".join(app_name_split[6:])
-            if app_name_split[0] == '':
-                app_name = 'unknown' + " : (UID -" + app_service_name + ")"
-            print(f"\tAffected application: [bold red]{app_name}[/bold red]")
-            conflict['Acl'] = True
-
-    print("\n[bold underline]Checking Shutdown Impact[/bold underline]")
+        report.host_checked('Acl', host)
+        flows, skip = checked_flows(host)
+        with span('check.acl', host=host):
+            for acl, entry, flow, protocol, app_service_name in iter_blocked_flows(acls, flows, jobs, join_fetches):
+                if id(flow) not in skip:
+                    report.add(acl_finding(host, acl, entry, flow, protocol, app_service_name))
+
+    path_index = None
+    if fabric_flows is not None:
+        with span('wait', host='fabric'):
+            fabric_flows = fabric_flows.result()
+        if fabric_flows:
+            with span('path_index'):
+                path_index = build_path_index(fabric_flows.get('connection_stats', []))
     for host in interfaces_data.keys():
-        shutdown_affected_flows, shutdown_ports = check_shutdown_impact(host, interfaces_data)
-        print(f"\nHost: [bold]{host}[/bold]")
-        if shutdown_affected_flows:
-            print(f"[bold red]WARNING: Shutting down these interfaces disrupts flows: {', '.join(shutdown_ports)}[/bold red]")
-            for flow, app_service_name in shutdown_affected_flows:
-                print(f"\tFlow: {flow.get('src_ip')}:{flow.get('src_port')} -> {flow.get('dst_ip')}:{flow.get('dst_port')}")
-                print(f"\tShutdown Interface: {flow.get('ingress_interface')} -> {flow.get('egress_interface')}")
-                app_name_split = app_service_name[37:].split("-")
-                app_name = app_name_split[0] + ":" + "-".join(app_name_split[6:])
-                if app_name_split[0] == '':
-                    app_name = 'unknown' + " : (UID -" + app_service_name + ")"
-                print(f"\tAffected application: [bold red]{app_name}[/bold red]")
-            conflict['Interface'] = True
-        else:
-            print(f"[bold green]No disruptions found from shutting down interfaces on {host}.[/bold green]")
+        shutdown_ports = get_shutdown_ports(host, interfaces_data)
+        report.host_checked('Interface', host, shutdown_ports=shutdown_ports)
+        if not shutdown_ports:
+            continue
+        flows, skip = checked_flows(host)
+        with span('check.interface', host=host):
+            for flow, app_service_name in iter_shutdown_affected(host, shutdown_ports, flows, path_index):
+                if id(flow) not in skip:
+                    report.add(shutdown_finding(host, flow, app_service_name, shutdown_ports))
 
-    print("\n[bold underline]Analyzing VLAN Config Impact[/bold underline]")
     for host, vlan_list in vlan_configs.items():
-        print(f"\nHost: [bold]{host}[/bold]")
-        impacts = analyze_vlan_impact(host, vlan_list)
+        report.host_checked('Vlan', host)
+        flows, skip = checked_flows(host)
+        with span('check.vlan', host=host):
+            for impact in iter_vlan_impacts(vlan_list, flows):
+                if id(impact['flow']) not in skip:
+                    report.add(vlan_finding(host, impact))
 
-        if not impacts:
-            print("[green]No VLAN disruptions detected.[/green]")
-            continue
 
-        for impact in impacts:
-            flow = impact['flow']
-            reason = impact['reason']
-            print(f'[bold red]WARNING: VLAN "{impact["vlan"]}" impact due to {reason}[/bold red]')
-            print(f"\tFlow: {flow.get('src_ip')}:{flow.get('src_port')} -> {flow.get('dst_ip')}:{flow.get('dst_port')}")
-            print(f"\tInterface: {flow.get('ingress_interface')} -> {flow.get('egress_interface')}")
-            if reason == 'acl':
-                print(f"\tInbound ACL: {impact.get('access_in')} | Outbound ACL: {impact.get('access_out')}")
-            print(f"\tAffected VLAN: {impact['vlan']}")
-            app_service_name = impact['app_name']
-            app_name_split = app_service_name[37:].split("-")
-            app_name = app_name_split[0] + ":" + "-".join(app_name_split[6:])
-            if app_name_split[0] == '':
-                app_name = 'unknown' + " : (UID -" + app_service_name + ")"
-            print(f"\tAffected application: [bold red]{app_name}[/bold red]")
-            conflict['Vlan'] = True
-
-    for key, value in conflict.items():
-        if value:
-            print(f"\n[bold red]Conflicts found, please review the {key} before proceeding.[/bold red]")
-
-    if not any(conflict.values()):
-        print("\n[bold green]No conflicts found. Configuration appears safe to proceed.[/bold green]")
+def enrich_report(report, args):
+    """Attach endpoint hostnames to the report's findings, one GetHostnames call per host at most."""
+    if args.no_hostnames or not report.findings:
+        return
+    from concurrent.futures import ThreadPoolExecutor
+
+    from config_validator.hostnames import HostnameCache, resolve_hostnames
+
+    with span('hostnames'), ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        resolve_hostnames(report.findings, HostnameCache(), executor)
+
+
+def main(argv=None):
+    args = build_parser().parse_intermixed_args(sys.argv[1:] if argv is None else argv)
+    with profiled(args.profile and args.profiler, args.profile):
+        with span('total'):
+            status = validate(args)
+    if args.timings:
+        tracer.print_summary()
+    if args.trace_file:
+        tracer.write_chrome_trace(args.trace_file)
+    return status
+
+
+def validate(args):
+    from concurrent.futures import ThreadPoolExecutor
+    from functools import partial
+
+    metadata = load_metadata()
+    acls_config_dir = metadata.get("host_vars_path")
+    intended_config_dir = metadata.get("intended_config_path")
+    if args.watch:
+        from config_validator.watch import watch
+
+        return watch(args, acls_config_dir, intended_config_dir)
+    with span('load_configs'):
+        acl_policies = read_yaml_configs(acls_config_dir, 'ip_access_lists')
+        interfaces_data = read_interface_data(intended_config_dir)
+        vlan_configs = read_yaml_configs(intended_config_dir, 'vlan_interfaces')
+
+    hosts = sorted(set(acl_policies) | set(interfaces_data) | set(vlan_configs))
+    max_findings = 1 if args.fail_fast else args.max_findings
+    report = Report(top=args.top, max_findings=max_findings)
+
+    store = None
+    fetch = partial(fetch_screened_flows, mode=args.fetch_mode)
+    if args.flow_store:
+        from config_validator.flow_store import FlowStore
+
+        store = FlowStore(args.flow_store, args.flow_window)
+        fetch = partial(stored_screened_flows, store, mode=fetch_mode(args))
+
+    # Fetch every host's flows ahead of the checks; in fail-fast mode the
+    # fetches still queued when the limit is hit are cancelled.
+    executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    if args.fetch_mode == 'auto' and store is None:
+        from config_validator.fetch_plan import fetch_planned, plan_fetches
+
+        plans = plan_fetches(executor, hosts, acl_policies, interfaces_data, vlan_configs)
+        host_flows = {plan.host: executor.submit(fetch_planned, plan) for plan in plans}
+    else:
+        host_flows = {
+            host: executor.submit(
+                fetch,
+                host,
+                acl_policies.get(host, []),
+                get_shutdown_ports(host, interfaces_data),
+                vlan_configs.get(host, []),
+            )
+            for host in hosts
+        }
+    # Fabric-wide flows only feed the shutdown check's path index.
+    fabric_flows = None
+    if any(get_shutdown_ports(host, interfaces_data) for host in interfaces_data):
+        fabric_flows = executor.submit(fetch_fabric_connection_stats)
+
+    try:
+        run_checks(
+            report, acl_policies, interfaces_data, vlan_configs, host_flows, fabric_flows, resolve_jobs(args.jobs),
+            critical_alert(args),
+        )
+    except FindingLimitReached:
+        pass
+    except FetchError as e:
+        print_error(f"{e}\nValidation aborted: flows could not be fetched.")
+        return 2
+    finally:
+        # In-flight pulls must finish before the store is closed.
+        executor.shutdown(wait=store is not None, cancel_futures=True)
+        if store is not None:
+            store.prune()
+            store.close()
+
+    enrich_report(report, args)
+    with span('report'):
+        write_report(report, args.format, args.output)
+    return 1 if report.conflicts() else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,373 @@
+"""Buffered validation report with rich, JSON Lines, JUnit and SARIF writers."""
+import json
+import sys
+from functools import lru_cache
+
+from config_validator.aggregate import ImpactAggregator
+
+CHECKS = ('Acl', 'Interface', 'Vlan')
+SECTION_TITLES = {
+    'Acl': 'Checking ACL Blocked Flows',
+    'Interface': 'Checking Shutdown Impact',
+    'Vlan': 'Analyzing VLAN Config Impact',
+}
+RULE_DESCRIPTIONS = {
+    'Acl': 'An ACL deny entry is the first match for a live flow.',
+    'Interface': 'Shutting down an interface disrupts live flows.',
+    'Vlan': 'A VLAN interface change impacts live flows.',
+}
+FLOW_FIELDS = ('src_ip', 'src_port', 'dst_ip', 'dst_port', 'protocol', 'ingress_interface', 'egress_interface',
+               'bytes', 'packets')
+
+
+@lru_cache(maxsize=4096)
+def decode_app_name(app_service_name):
+    app_name_split = app_service_name[37:].split("-")
+    if app_name_split[0] == '':
+        return 'unknown' + " : (UID -" + app_service_name + ")"
+    return app_name_split[0] + ":" + "-".join(app_name_split[6:])
+
+
+def _flow_fields(flow):
+    fields = {field: flow.get(field) for field in FLOW_FIELDS}
+    # Names Clover already attached; see config_validator.hostnames.
+    for field in ('src_hostnames', 'dst_hostnames'):
+        if flow.get(field):
+            fields[field] = flow[field]
+    return fields
+
+
+def endpoint(flow, side):
+    """`hostname (ip):port`, or `ip:port` when the address has no known name."""
+    address = flow[f'{side}_ip']
+    if flow.get(f'{side}_hostname'):
+        address = f"{flow[f'{side}_hostname']} ({address})"
+    return f"{address}:{flow[f'{side}_port']}"
+
+
+def endpoints(flow):
+    return f"{endpoint(flow, 'src')} -> {endpoint(flow, 'dst')}"
+
+
+def critical_label(result):
+    """Prefix for findings on control-plane flows; see config_validator.critical."""
+    return f"CRITICAL {result['critical']}: " if result.get('critical') else ""
+
+
+def acl_finding(host, acl, entry, flow, protocol, app_service_name):
+    name = acl.get('name', 'unknown')
+    return {
+        'check': 'Acl',
+        'host': host,
+        'target': f'ACL {name} seq {entry.get("sequence", "-")}',
+        'acl': name,
+        'sequence': entry.get('sequence'),
+        'protocol': protocol,
+        'source_ports': entry.get('source_ports', []),
+        'destination_ports': entry.get('destination_ports', []),
+        'flow': _flow_fields(flow),
+        'app_service_name': app_service_name,
+    }
+
+
+def shutdown_finding(host, flow, app_service_name, shutdown_ports):
+    target = ', '.join(shutdown_ports)
+    for interface in (flow.get('ingress_interface'), flow.get('egress_interface')):
+        if interface in shutdown_ports:
+            target = interface
+            break
+    return {
+        'check': 'Interface',
+        'host': host,
+        'target': target,
+        'shutdown_ports': list(shutdown_ports),
+        'flow': _flow_fields(flow),
+        'app_service_name': app_service_name,
+    }
+
+
+def vlan_finding(host, impact):
+    finding = {
+        'check': 'Vlan',
+        'host': host,
+        'target': f'{impact["vlan"]} ({impact["reason"]})',
+        'vlan': impact['vlan'],
+        'reason': impact['reason'],
+        'flow': _flow_fields(impact['flow']),
+        'app_service_name': impact['app_name'],
+    }
+    if impact['reason'] == 'acl':
+        finding['access_in'] = impact.get('access_in')
+        finding['access_out'] = impact.get('access_out')
+    return finding
+
+
+def describe(result):
+    """One-line, markup-free description of a finding or an aggregated group."""
+    app_name = decode_app_name(result['app_service_name'])
+    if 'flow' not in result:
+        return (f"{result['target']} on {result['host']} impacts {app_name}: "
+                f"{result['flows']} flows, {result['bytes']} bytes, {result['packets']} packets")
+    flow = result['flow']
+    flow_endpoints = endpoints(flow)
+    label = critical_label(result)
+    if result['check'] == 'Acl':
+        return f'{label}ACL "{result["acl"]}" sequence {result["sequence"]} blocks {result["protocol"]} flow {flow_endpoints} ({app_name})'
+    if result['check'] == 'Interface':
+        return f"{label}Shutting down {result['target']} disrupts flow {flow_endpoints} ({app_name})"
+    return f'{label}VLAN "{result["vlan"]}" impact due to {result["reason"]} on flow {flow_endpoints} ({app_name})'
+
+
+class FindingLimitReached(Exception):
+    """Raised by Report.add once the configured number of findings is collected."""
+
+
+class Report:
+    """Collects findings for all hosts and writes them in a single pass.
+
+    With `top` set, findings are folded into an ImpactAggregator instead of
+    being kept, and only the heaviest groups are reported. With
+    `max_findings` set, adding the last allowed finding raises
+    FindingLimitReached so the caller can stop checking.
+    """
+
+    def __init__(self, top=None, max_findings=None):
+        self.findings = []
+        self.aggregator = ImpactAggregator(top) if top else None
+        self.max_findings = max_findings
+        self.count = 0
+        self.truncated = False
+        self.checked = {check: [] for check in CHECKS}
+        self.context = {}
+        self.warnings = []
+
+    def host_checked(self, check, host, **context):
+        # Critical findings may register a host before its full check does.
+        if host not in self.checked[check]:
+            self.checked[check].append(host)
+        if context:
+            self.context[(check, host)] = context
+
+    def warn(self, check, host, message):
+        """Record a problem that leaves part of the host's check unchecked, once."""
+        warning = {'check': check, 'host': host, 'message': message}
+        if warning not in self.warnings:
+            self.warnings.append(warning)
+
+    def add(self, finding):
+        if self.aggregator is not None:
+            flow = finding['flow']
+            self.aggregator.add(finding['check'], finding['host'], finding['target'], finding['app_service_name'],
+                                {'bytes': flow.get('bytes') or 0, 'packets': flow.get('packets') or 0})
+        else:
+            self.findings.append(finding)
+        self.count += 1
+        if self.max_findings and self.count >= self.max_findings:
+            self.truncated = True
+            raise FindingLimitReached()
+
+    def results(self):
+        if self.aggregator is not None:
+            return self.aggregator.top()
+        return self.findings
+
+    def conflicts(self):
+        """Return the checks that produced at least one finding, in check order."""
+        if self.aggregator is not None:
+            found = set(self.aggregator.counts)
+        else:
+            found = {finding['check'] for finding in self.findings}
+        return [check for check in CHECKS if check in found]
+
+    def by_host(self):
+        grouped = {}
+        for result in self.results():
+            grouped.setdefault((result['check'], result['host']), []).append(result)
+        return grouped
+
+
+def _closing_lines(report):
+    from rich.markup import escape
+
+    conflicts = report.conflicts()
+    lines = [f"\n[bold yellow]WARNING: {warning['host']}: {escape(warning['message'])}[/bold yellow]"
+             for warning in report.warnings]
+    if report.truncated:
+        lines.append(f"\n[bold yellow]Stopped after {report.count} findings; remaining checks were skipped.[/bold yellow]")
+    lines += [f"\n[bold red]Conflicts found, please review the {check} before proceeding.[/bold red]"
+             for check in conflicts]
+    if not conflicts:
+        lines.append("\n[bold green]No conflicts found. Configuration appears safe to proceed.[/bold green]")
+    return lines
+
+
+def _detail_lines(report):
+    lines = []
+    grouped = report.by_host()
+    for check in CHECKS:
+        if report.truncated and not report.checked[check]:
+            continue
+        lines.append(f"\n[bold underline]{SECTION_TITLES[check]}[/bold underline]")
+        for host in report.checked[check]:
+            lines.append(f"\nHost: [bold]{host}[/bold]")
+            findings = grouped.get((check, host), [])
+            if check == 'Acl':
+                if not findings:
+                    lines.append("[bold green]No protocol conflicts found for this host[/bold green]")
+                for finding in findings:
+                    flow = finding['flow']
+                    lines.append(f'[bold red]WARNING: {critical_label(finding)}ACL "{finding["acl"]}" sequence {finding["sequence"] or "-"} blocks protocol {finding["protocol"]}[/bold red]')
+                    lines.append(f"\tFlow: {endpoints(flow)}")
+                    lines.append(f"\tBlocked Ports: SRC {finding['source_ports']} -> DST {finding['destination_ports']}")
+                    lines.append(f"\tInterface: {flow['ingress_interface']} -> {flow['egress_interface']}")
+                    lines.append(f"\tAffected application: [bold red]{decode_app_name(finding['app_service_name'])}[/bold red]")
+            elif check == 'Interface':
+                if not findings:
+                    lines.append(f"[bold green]No disruptions found from shutting down interfaces on {host}.[/bold green]")
+                    continue
+                shutdown_ports = report.context.get((check, host), {}).get('shutdown_ports', [])
+                lines.append(f"[bold red]WARNING: Shutting down these interfaces disrupts flows: {', '.join(shutdown_ports)}[/bold red]")
+                for finding in findings:
+                    flow = finding['flow']
+                    if finding.get('critical'):
+                        lines.append(f"[bold red]{critical_label(finding)}control-plane flow disrupted[/bold red]")
+                    lines.append(f"\tFlow: {endpoints(flow)}")
+                    lines.append(f"\tShutdown Interface: {flow['ingress_interface']} -> {flow['egress_interface']}")
+                    lines.append(f"\tAffected application: [bold red]{decode_app_name(finding['app_service_name'])}[/bold red]")
+            else:
+                if not findings:
+                    lines.append("[green]No VLAN disruptions detected.[/green]")
+                for finding in findings:
+                    flow = finding['flow']
+                    lines.append(f'[bold red]WARNING: {critical_label(finding)}VLAN "{finding["vlan"]}" impact due to {finding["reason"]}[/bold red]')
+                    lines.append(f"\tFlow: {endpoints(flow)}")
+                    lines.append(f"\tInterface: {flow['ingress_interface']} -> {flow['egress_interface']}")
+                    if finding['reason'] == 'acl':
+                        lines.append(f"\tInbound ACL: {finding.get('access_in')} | Outbound ACL: {finding.get('access_out')}")
+                    lines.append(f"\tAffected VLAN: {finding['vlan']}")
+                    lines.append(f"\tAffected application: [bold red]{decode_app_name(finding['app_service_name'])}[/bold red]")
+    return lines
+
+
+def _top_lines(report):
+    k = report.aggregator.k
+    lines = [f"\n[bold underline]Top {k} Impacts by Traffic Volume[/bold underline]"]
+    for rank, group in enumerate(report.results(), 1):
+        lines.append(f"{rank:>3}. [bold red]{group['check']}[/bold red] {group['host']} {group['target']}")
+        lines.append(f"\tAffected application: [bold red]{decode_app_name(group['app_service_name'])}[/bold red]")
+        lines.append(f"\tBytes: {group['bytes']} | Packets: {group['packets']} | Flows: {group['flows']}")
+    lines.append("\n[bold underline]Summary[/bold underline]")
+    for check, counts in report.aggregator.summary().items():
+        lines.append(f"{check}: {counts['impacts']} impacted flows in {counts['groups']} groups across {counts['hosts']} hosts")
+    return lines
+
+
+def write_rich(report, stream):
+    from rich.console import Console
+
+    lines = _top_lines(report) if report.aggregator is not None else _detail_lines(report)
+    Console(file=stream, highlight=False).print("\n".join(lines + _closing_lines(report)))
+
+
+def write_summary(report, stream):
+    from rich.console import Console
+    from rich.table import Table
+
+    grouped = report.by_host()
+    table = Table(title="Validation Summary")
+    table.add_column("Check")
+    table.add_column("Host")
+    table.add_column("Impacts", justify="right")
+    table.add_column("Applications", justify="right")
+    for check in CHECKS:
+        for host in report.checked[check]:
+            results = grouped.get((check, host), [])
+            impacts = sum(result.get('flows', 1) for result in results)
+            applications = len({result['app_service_name'] for result in results})
+            style = "bold red" if results else "green"
+            table.add_row(check, host, str(impacts), str(applications), style=style)
+    console = Console(file=stream, highlight=False)
+    console.print(table)
+    console.print("\n".join(_closing_lines(report)))
+
+
+def write_jsonl(report, stream):
+    lines = []
+    for result in report.results():
+        lines.append(json.dumps({**result, 'app_name': decode_app_name(result['app_service_name'])}, default=str))
+    # Warnings carry no 'check' key, so consumers that read findings by check skip them.
+    lines.extend(json.dumps({'warning': warning['message'], 'host': warning['host']}) for warning in report.warnings)
+    if lines:
+        stream.write("\n".join(lines) + "\n")
+
+
+def write_junit(report, stream):
+    import xml.etree.ElementTree as ET
+
+    grouped = report.by_host()
+    suites = ET.Element("testsuites", name="config_validator")
+    for check in CHECKS:
+        hosts = report.checked[check]
+        failures = sum(1 for host in hosts if grouped.get((check, host)))
+        suite = ET.SubElement(suites, "testsuite", name=check, tests=str(len(hosts)), failures=str(failures))
+        for host in hosts:
+            case = ET.SubElement(suite, "testcase", classname=f"config_validator.{check}", name=host)
+            results = grouped.get((check, host))
+            if results:
+                failure = ET.SubElement(case, "failure", message=f"{len(results)} impacted flows", type=check)
+                failure.text = "\n".join(describe(result) for result in results)
+        warnings = [f"{warning['host']}: {warning['message']}" for warning in report.warnings
+                    if warning['check'] == check]
+        if warnings:
+            ET.SubElement(suite, "system-err").text = "\n".join(warnings)
+    stream.write(ET.tostring(suites, encoding="unicode") + "\n")
+
+
+def write_sarif(report, stream):
+    sarif = {
+        "version": "2.1.0",
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "runs": [{
+            "tool": {"driver": {
+                "name": "config_validator",
+                "rules": [{"id": check, "shortDescription": {"text": RULE_DESCRIPTIONS[check]}} for check in CHECKS],
+            }},
+            "results": [
+                {
+                    "ruleId": result['check'],
+                    "level": "error",
+                    "message": {"text": describe(result)},
+                    "locations": [{"logicalLocations": [{"name": result['host'], "kind": "module"}]}],
+                }
+                for result in report.results()
+            ] + [
+                {
+                    "ruleId": warning['check'],
+                    "level": "warning",
+                    "message": {"text": warning['message']},
+                    "locations": [{"logicalLocations": [{"name": warning['host'], "kind": "module"}]}],
+                }
+                for warning in report.warnings
+            ],
+        }],
+    }
+    json.dump(sarif, stream)
+    stream.write("\n")
+
+
+WRITERS = {
+    'rich': write_rich,
+    'summary': write_summary,
+    'jsonl': write_jsonl,
+    'junit': write_junit,
+    'sarif': write_sarif,
+}
+
+
+def write_report(report, output_format='rich', path=None):
+    writer = WRITERS[output_format]
+    if not path:
+        writer(report, sys.stdout)
+        return
+    with open(path, "w") as f:
+        writer(report, f)
@@ -1,14 +1,14 @@
-import subprocess
 import time
-import requests
 import sys
 import os
 import json
 
+# Keep module-level imports light: `--help` and config-only runs should not
+# pay for requests, rich, yaml or the API server's gRPC stack.
+from config_validator.cli import build_parser, check_args
+
 config_dir = os.path.expanduser("~/.config/config_validator")
-os.makedirs(config_dir, exist_ok=True)
 METADATA_FILE = os.path.join(config_dir, "metadata.json")
-print(METADATA_FILE)
 
 def load_metadata():
     """Load metadata from metadata.json file."""
@@ -19,6 +19,7 @@ def load_metadata():
 
 def save_metadata(metadata):
     """Save metadata (file path and access token) to metadata.json."""
+    os.makedirs(config_dir, exist_ok=True)
     with open(METADATA_FILE, "w") as f:
         json.dump(metadata, f, indent=4)
 
@@ -36,17 +37,48 @@ def get_user_input(metadata):
 
     save_metadata(metadata)
 
-def wait_for_server(url: str, timeout: int = 15):
-    """Wait for FastAPI server to be ready."""
-    for _ in range(timeout):
+def wait_for_server(server, ready_fd: int, timeout: float = 30):
+    """Wait for the API server's readiness message, then confirm it with /healthz.
+
+    The server writes to `ready_fd` once its inventory is loaded; the probe
+    only covers the short gap before uvicorn starts accepting connections.
+    """
+    import requests
+    import select
+
+    from config_validator import transport
+
+    readable, _, _ = select.select([ready_fd], [], [], timeout)
+    if not readable or not os.read(ready_fd, 64).startswith(b"ready"):
+        return False  # timed out, or the server exited before it was ready
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while time.monotonic() < deadline:
         try:
-            if requests.get(url).status_code == 200:
+            if transport.session().get(transport.url("/healthz"), timeout=1).status_code == 200:
                 return True
-        except:
-            time.sleep(1)
+        except requests.exceptions.ConnectionError:
+            pass
+        if server.poll() is not None:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
     return False
 
+def server_address(run_dir: str):
+    """Pick a per-run address for the API server; return (uvicorn args, checker env)."""
+    import socket
+
+    if hasattr(socket, "AF_UNIX"):
+        path = os.path.join(run_dir, "api.sock")
+        return ["--uds", path], {"CONFIG_VALIDATOR_API_SOCKET": path}
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return ["--port", str(port)], {"CONFIG_VALIDATOR_API_URL": f"http://127.0.0.1:{port}"}
+
 def print_usage():
+   # stderr, so reports written to stdout stay machine-readable.
    print("""
 ┌───────────────────────────────────────────────────────────────────────────────────┐
 │                           🛠️  USAGE: validate-config                               │
@@ -84,12 +116,13 @@ def print_usage():
 │                                                                              │
 │  This will update the saved metadata values.                                 │
 └──────────────────────────────────────────────────────────────────────────────┘
-""")
+""", file=sys.stderr)
 
 
 
 
 def main():
+    args = build_parser().parse_intermixed_args()
     metadata = load_metadata()
 
     # Check for token.txt in current directory
@@ -101,55 +134,72 @@ def main():
                 if "access_token" not in metadata:
                     metadata["access_token"] = token_from_file
             else:
-                print("⚠️  token.txt found but it's empty. Skipping.")
+                print("⚠️  token.txt found but it's empty. Skipping.", file=sys.stderr)
 
-    # Show usage if no metadata and no CLI args
-    if len(sys.argv) < 3:
-        print_usage()
-
-    # Prompt user if required values are missing
+    # Show usage and prompt only when neither saved metadata nor CLI args have the required values
     required_keys = ["access_token", "host_vars_path", "intended_config_path"]
-    if not all(key in metadata for key in required_keys):
-        print("Missing required information. Please provide the following:")
+    if len(args.positional) < 3 and not all(key in metadata for key in required_keys):
+        print_usage()
+        print("Missing required information. Please provide the following:", file=sys.stderr)
         get_user_input(metadata)
 
     # If user provides new values via command line, update metadata
-    if len(sys.argv) >= 4:
-        metadata["access_token"] = sys.argv[1]
-        metadata["host_vars_path"] = sys.argv[2]
-        metadata["intended_config_path"] = sys.argv[3]
+    if len(args.positional) >= 3:
+        metadata["access_token"] = args.positional[0]
+        metadata["host_vars_path"] = args.positional[1]
+        metadata["intended_config_path"] = args.positional[2]
         save_metadata(metadata)
 
-    # Start FastAPI server
+    import shutil
+    import subprocess
+    import tempfile
+
+    # Start FastAPI server on a per-run socket so concurrent runs don't collide
+    run_dir = tempfile.mkdtemp(prefix="config_validator-")
+    listen_args, client_env = server_address(run_dir)
+    os.environ.update(client_env)
     env = os.environ.copy()
+    if args.record:
+        env["CONFIG_VALIDATOR_RECORD"] = os.path.abspath(args.record)
+    if args.replay:
+        env["CONFIG_VALIDATOR_REPLAY"] = os.path.abspath(args.replay)
+    ready_fd, ready_write_fd = os.pipe()
+    env["CONFIG_VALIDATOR_READY_FD"] = str(ready_write_fd)
+    # Send server output to a file: nothing drains a pipe, and in --watch a
+    # full pipe buffer would block the server's logging and hang the session.
+    server_log = open(os.path.join(run_dir, "server.log"), "w+")
     server = subprocess.Popen(
         [
-            sys.executable, "-m", "uvicorn", "config_validator.api.main:app", "--port", "8000"
+            sys.executable, "-m", "uvicorn", "config_validator.api.main:app", *listen_args, "--no-access-log"
         ],
         env=env,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        pass_fds=(ready_write_fd,),
+        stdout=server_log,
+        stderr=subprocess.STDOUT,
     )
-    # while True:
-    #     output = server.stdout.readline()
-    #     error = server.stderr.readline()
-    #     if output:
-    #         print("STDOUT:", output.strip())
-    #     if error:
-    #         print("STDERR:", error.strip())
-    #     if not output and not error and server.poll() is not None:
-    #         break
+    os.close(ready_write_fd)
     try:
-        if not wait_for_server("http://localhost:8000/docs"):
+        started = time.perf_counter()
+        if not wait_for_server(server, ready_fd):
             print("Server did not start.")
+            server_log.seek(0)
+            sys.stderr.write(server_log.read())
             server.terminate()
             sys.exit(1)
+        if args.timings:
+            print(f"Server ready in {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+
+        # Run the checks in this process rather than a second interpreter.
+        from config_validator.query_check import main as check
 
-        subprocess.run([sys.executable, "-m", "config_validator.query_check"])
+        status = check(check_args(sys.argv[1:], args.positional))
     finally:
+        os.close(ready_fd)
         server.terminate()
         server.wait()
+        server_log.close()
+        shutil.rmtree(run_dir, ignore_errors=True)
+    sys.exit(status)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+"""Synthetic flows and AVD-style configs for benchmarks and load tests.
+
+Flows are shaped like `MessageToDict(ConnectionStats, preserving_proto_field_name=True)`
+output, so they can be fed straight into the checks or converted back into
+protobuf messages for a fake Clover server.
+"""
+import os
+import random
+import uuid
+
+import yaml
+
+PROTOCOL_MIX = (6, 6, 6, 17, 17, 1)
+COMMON_PORTS = (22, 53, 80, 123, 179, 443, 514, 3784, 8080)
+APPLICATIONS = ("web", "dns", "ssh", "bgp", "ntp", "backup", "db", "syslog")
+
+
+def hostname(index):
+    return f"leaf{index + 1}"
+
+
+def interface_name(index):
+    return f"Ethernet{index + 1}"
+
+
+def app_service_name(rng, app):
+    return f"{uuid.UUID(int=rng.getrandbits(128))}-{app}-0-0-0-0-0-{app}-svc"
+
+
+def generate_flows(count, interfaces=48, subnets=64, seed=0, device_id=None, path_devices=0):
+    """Return `count` connection-stats dicts spread over `interfaces` and `subnets`."""
+    rng = random.Random(seed)
+    apps = [app_service_name(rng, app) for app in APPLICATIONS]
+    flows = []
+    for _ in range(count):
+        protocol = rng.choice(PROTOCOL_MIX)
+        flow = {
+            'src_ip': f"10.{rng.randrange(subnets)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'dst_ip': f"10.{rng.randrange(subnets)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'protocol': protocol,
+            'bytes': str(rng.randrange(64, 10_000_000)),
+            'packets': str(rng.randrange(1, 10_000)),
+            'ingress_interface': interface_name(rng.randrange(interfaces)),
+            'egress_interface': interface_name(rng.randrange(interfaces)),
+            'applications': [{'app_service_name': rng.choice(apps)}],
+        }
+        if protocol != 1:
+            flow['src_port'] = rng.randrange(1024, 65536)
+            flow['dst_port'] = rng.choice(COMMON_PORTS) if rng.random() < 0.7 else rng.randrange(1, 65536)
+        if device_id:
+            flow['device_id'] = device_id
+        if path_devices:
+            flow['path'] = {'nodes': [
+                {
+                    'device_id': f"SN{hop:04d}",
+                    'hostname': hostname(hop),
+                    'ingress_interface': interface_name(rng.randrange(interfaces)),
+                    'egress_interface': interface_name(rng.randrange(interfaces)),
+                }
+                for hop in rng.sample(range(path_devices), min(3, path_devices))
+            ]}
+        flows.append(flow)
+    return flows
+
+
+def generate_acls(entries, acls=1, subnets=64, seed=0):
+    """Return AVD `ip_access_lists` with `entries` entries per ACL and a mix of match styles."""
+    rng = random.Random(seed)
+    lists = []
+    for index in range(acls):
+        acl_entries = []
+        for position in range(entries):
+            entry = {
+                'sequence': (position + 1) * 10,
+                'action': 'deny' if rng.random() < 0.3 else 'permit',
+                'protocol': rng.choice(('tcp', 'udp', 'ip')),
+                'source': rng.choice(('any', f"10.{rng.randrange(subnets)}.0.0/16",
+                                      f"10.{rng.randrange(subnets)}.{rng.randrange(256)}.0/24")),
+                'destination': rng.choice(('any', f"10.{rng.randrange(subnets)}.{rng.randrange(256)}.0/24",
+                                           f"host 10.{rng.randrange(subnets)}.{rng.randrange(256)}.{rng.randrange(1, 255)}")),
+            }
+            if entry['protocol'] != 'ip':
+                style = rng.random()
+                if style < 0.4:
+                    entry['destination_ports'] = [rng.choice(COMMON_PORTS)]
+                elif style < 0.6:
+                    low = rng.randrange(1024, 60000)
+                    entry['destination_ports'] = [f"{low}-{low + rng.randrange(1, 5000)}"]
+                elif style < 0.7:
+                    entry['destination_ports'] = ['gt 1023']
+            acl_entries.append(entry)
+        lists.append({'name': f"ACL-{index + 1}", 'entries': acl_entries})
+    return lists
+
+
+def generate_interfaces(count, shutdown_ratio=0.05, seed=0):
+    rng = random.Random(seed)
+    return {
+        'ethernet_interfaces': [
+            {'name': interface_name(index), 'shutdown': rng.random() < shutdown_ratio} for index in range(count)
+        ],
+        'port_channel_interfaces': [],
+    }
+
+
+def generate_svis(count, subnets=64, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'name': f"Vlan{100 + index}",
+            'ip_address': f"10.{rng.randrange(subnets)}.{rng.randrange(256)}.1/24",
+            'shutdown': rng.random() < 0.1,
+            'ip_access_group_in': f"ACL-{index % 4 + 1}",
+        }
+        for index in range(count)
+    ]
+
+
+def write_fabric(directory, hosts, acl_entries=100, interfaces=48, svis=16, seed=0):
+    """Write host_vars/ and structured_config/ YAML trees; return both directory paths."""
+    host_vars = os.path.join(directory, "host_vars")
+    structured_config = os.path.join(directory, "structured_config")
+    os.makedirs(host_vars, exist_ok=True)
+    os.makedirs(structured_config, exist_ok=True)
+    for index in range(hosts):
+        name = hostname(index)
+        with open(os.path.join(host_vars, f"{name}.yml"), "w") as f:
+            yaml.safe_dump({'ip_access_lists': generate_acls(acl_entries, seed=seed + index)}, f)
+        with open(os.path.join(structured_config, f"{name}.yml"), "w") as f:
+            config = generate_interfaces(interfaces, seed=seed + index)
+            config['vlan_interfaces'] = generate_svis(svis, seed=seed + index)
+            yaml.safe_dump(config, f)
+    return host_vars, structured_config
@@ -0,0 +1,159 @@
+"""Per-phase timing spans, summary table, Chrome-trace export and profiler hooks."""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Spans recorded while serving one API request, reported via Server-Timing.
+request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+class Tracer:
+    """Records nested (name, start, end) spans, per thread."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        # Long-running processes (the API server) turn recording off so
+        # spans from shared code paths don't accumulate forever.
+        self.enabled = True
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._local.__dict__.setdefault('stack', [])
+        parent = stack[-1] if stack else None
+        attrs = {**(parent['attrs'] if parent else {}), **attrs}
+        record = {'name': name, 'attrs': attrs, 'depth': len(stack), 'thread': threading.get_ident()}
+        stack.append(record)
+        record['start'] = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['end'] = time.perf_counter()
+            stack.pop()
+            if self.enabled:
+                self.spans.append(record)
+
+    def add(self, name, start, duration, **attrs):
+        """Record a span measured elsewhere, e.g. from a Server-Timing header."""
+        if not self.enabled:
+            return
+        stack = self._local.__dict__.get('stack', [])
+        parent = stack[-1] if stack else None
+        attrs = {**(parent['attrs'] if parent else {}), **attrs}
+        self.spans.append({
+            'name': name, 'attrs': attrs, 'depth': len(stack), 'thread': threading.get_ident(),
+            'start': start, 'end': start + duration,
+        })
+
+    def summary(self):
+        """Return rows of (phase, host, count, total seconds, max seconds), slowest first."""
+        rows = {}
+        for record in self.spans:
+            key = (record['name'], record['attrs'].get('host', ''))
+            duration = record['end'] - record['start']
+            row = rows.setdefault(key, [0, 0.0, 0.0])
+            row[0] += 1
+            row[1] += duration
+            row[2] = max(row[2], duration)
+        return sorted(((name, host, *row) for (name, host), row in rows.items()), key=lambda row: -row[3])
+
+    def print_summary(self, stream=sys.stderr):
+        from rich.console import Console
+        from rich.table import Table
+
+        table = Table(title="Timings")
+        table.add_column("Phase")
+        table.add_column("Host")
+        table.add_column("Count", justify="right")
+        table.add_column("Total ms", justify="right")
+        table.add_column("Max ms", justify="right")
+        for name, host, count, total, longest in self.summary():
+            table.add_row(name, host, str(count), f"{total * 1000:.1f}", f"{longest * 1000:.1f}")
+        Console(file=stream).print(table)
+
+    def write_chrome_trace(self, path):
+        """Write spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = [
+            {
+                'name': record['name'],
+                'ph': 'X',
+                'ts': (record['start'] - self.origin) * 1e6,
+                'dur': (record['end'] - record['start']) * 1e6,
+                'pid': pid,
+                'tid': record['thread'],
+                'args': record['attrs'],
+            }
+            for record in self.spans
+        ]
+        with open(path, "w") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+
+
+tracer = Tracer()
+span = tracer.span
+
+
+@contextmanager
+def server_span(name):
+    """Time a phase of the current API request for its Server-Timing header."""
+    spans = request_spans.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if spans is not None:
+            spans.append((name, time.perf_counter() - start))
+
+
+def format_server_timing(spans):
+    return ", ".join(f"{name};dur={duration * 1000:.2f}" for name, duration in spans)
+
+
+def parse_server_timing(header):
+    """Return [(name, seconds)] from a Server-Timing header value."""
+    spans = []
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                spans.append((name, float(value) / 1000))
+    return spans
+
+
+@contextmanager
+def profiled(profiler, path):
+    """Run the enclosed block under cProfile or pyinstrument, writing results to `path`."""
+    if not profiler:
+        yield
+        return
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument is not installed; falling back to cProfile.", file=sys.stderr)
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, "w") as f:
+                    f.write(profiler.output_html() if path.endswith(".html") else profiler.output_text())
+            return
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,65 @@
+"""Pooled keep-alive HTTP session for the local API server, over TCP or a Unix domain socket.
+
+The runner starts the server on a per-run socket and exports its location:
+CONFIG_VALIDATOR_API_SOCKET for a Unix domain socket, or
+CONFIG_VALIDATOR_API_URL for a TCP address. Without either, the checker
+talks to http://127.0.0.1:8000 as before.
+"""
+import os
+import socket
+import threading
+
+DEFAULT_URL = "http://127.0.0.1:8000"
+POOL_SIZE = 16
+
+_lock = threading.Lock()
+_session = None
+
+
+def api_socket():
+    return os.getenv("CONFIG_VALIDATOR_API_SOCKET")
+
+
+def url(path):
+    # The host part is ignored when connecting over a Unix domain socket.
+    base = "http://localhost" if api_socket() else os.getenv("CONFIG_VALIDATOR_API_URL", DEFAULT_URL)
+    return f"{base}{path}"
+
+
+def _unix_adapter(path):
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+    from urllib3.connectionpool import HTTPConnectionPool
+
+    class UnixConnection(HTTPConnection):
+        def _new_conn(self):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if isinstance(self.timeout, (int, float)):
+                sock.settimeout(self.timeout)
+            sock.connect(path)
+            return sock
+
+    class UnixConnectionPool(HTTPConnectionPool):
+        ConnectionCls = UnixConnection
+
+    class UnixAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {"http": UnixConnectionPool}
+
+    return UnixAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+
+
+def session():
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            path = api_socket()
+            adapter = _unix_adapter(path) if path else HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+        return _session
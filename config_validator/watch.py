@@ -0,0 +1,252 @@
+"""`--watch`: revalidate the affected hosts whenever a config file changes.
+
+Parsed configs are kept per file and flows per host, so a save re-parses
+one file and re-runs only that host's checks. Cached flows are fetched
+unscreened (the screen depends on the config being edited) and refreshed
+after flow_cache.FLOW_TTL seconds. With --flow-store, the same TTL paces
+incremental pulls into the store instead.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config_validator.critical import screen_indexed, with_critical
+from config_validator.flow_cache import FlowCache
+from config_validator.parallel import resolve_jobs
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import (
+    FETCH_WORKERS, FetchError, critical_alert, enrich_report, fetch_connection_stats, fetch_fabric_connection_stats,
+    fetch_mode, get_shutdown_ports, host_name, interface_config, is_yaml, print_error, pull_stored_flows, read_yaml_file,
+    run_checks,
+)
+from config_validator.report import FindingLimitReached, Report, write_report
+
+DEBOUNCE = 0.05
+POLL_INTERVAL = 0.5
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Reports changed files in a set of directories using Linux inotify."""
+
+    def __init__(self, directories):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_MODIFY
+        self.directories = {}
+        for directory in directories:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.directories[wd] = directory
+
+    def _read(self, changed):
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name and wd in self.directories:
+                changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+
+    def wait(self):
+        """Block until files change; return their paths once saves settle."""
+        changed = set()
+        select.select([self.fd], [], [])
+        self._read(changed)
+        # Editors often write, rename and chmod in quick succession.
+        while select.select([self.fd], [], [], DEBOUNCE)[0]:
+            self._read(changed)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: compares file mtimes."""
+
+    def __init__(self, directories):
+        self.directories = directories
+        self.mtimes = self._scan()
+
+    def _scan(self):
+        mtimes = {}
+        for directory in self.directories:
+            for entry in os.scandir(directory):
+                mtimes[entry.path] = entry.stat().st_mtime_ns
+        return mtimes
+
+    def wait(self):
+        while True:
+            time.sleep(POLL_INTERVAL)
+            mtimes = self._scan()
+            changed = {path for path in mtimes.keys() | self.mtimes.keys() if mtimes.get(path) != self.mtimes.get(path)}
+            self.mtimes = mtimes
+            if changed:
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directories):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories)
+
+
+class ConfigState:
+    """ACL, interface and VLAN configs per host, re-parsed one file at a time."""
+
+    def __init__(self, host_vars_dir, structured_config_dir):
+        self.host_vars_dir = host_vars_dir and os.path.normpath(host_vars_dir)
+        self.structured_config_dir = structured_config_dir and os.path.normpath(structured_config_dir)
+        self.acl_policies = {}
+        self.interfaces_data = {}
+        self.vlan_configs = {}
+
+    def directories(self):
+        return [d for d in (self.host_vars_dir, self.structured_config_dir) if d and os.path.isdir(d)]
+
+    def hosts(self):
+        return set(self.acl_policies) | set(self.interfaces_data) | set(self.vlan_configs)
+
+    def load(self):
+        paths = set()
+        for directory in self.directories():
+            paths.update(os.path.join(directory, name) for name in os.listdir(directory))
+        return self.update(paths)
+
+    def update(self, paths):
+        """Re-read `paths`; return the hosts whose config actually changed."""
+        changed = set()
+        for path in paths:
+            if not is_yaml(path):
+                continue
+            host = host_name(path)
+            try:
+                data = read_yaml_file(path) if os.path.exists(path) else None
+            except Exception as e:
+                print_error(f"Skipping {path}: {e}")
+                continue
+            directory = os.path.dirname(path)
+            if directory == self.host_vars_dir:
+                sections = ((self.acl_policies, lambda d: d.get('ip_access_lists', [])),)
+            elif directory == self.structured_config_dir:
+                sections = (
+                    (self.interfaces_data, interface_config),
+                    (self.vlan_configs, lambda d: d.get('vlan_interfaces', [])),
+                )
+            else:
+                continue
+            for configs, extract in sections:
+                if data is None:
+                    if configs.pop(host, None) is not None:
+                        changed.add(host)
+                    continue
+                value = extract(data)
+                if configs.get(host) != value:
+                    configs[host] = value
+                    changed.add(host)
+        return changed
+
+
+def screened_flows(flow_cache, state, host, store=None, mode='connections'):
+    prescreen = build_prescreen(
+        state.acl_policies.get(host, []),
+        get_shutdown_ports(host, state.interfaces_data),
+        state.vlan_configs.get(host, []),
+    )
+    if prescreen.empty:
+        return {'connection_stats': []}
+    if store is not None:
+        # The cache entry only rate-limits pulls; the flows live in the store.
+        flow_cache.get(host, lambda: pull_stored_flows(store, host, mode))
+        return store.flows(host, prescreen)
+    # The critical index is built once per cached snapshot and screened with it.
+    flows = flow_cache.get(host, lambda: with_critical(fetch_connection_stats(host, mode=mode)))
+    return screen_indexed(flows, prescreen)
+
+
+def revalidate(args, state, flow_cache, executor, hosts, store=None):
+    start = time.perf_counter()
+    hosts = sorted(hosts & state.hosts())
+    max_findings = 1 if args.fail_fast else args.max_findings
+    report = Report(top=args.top, max_findings=max_findings)
+    host_flows = {
+        host: executor.submit(screened_flows, flow_cache, state, host, store, fetch_mode(args)) for host in hosts
+    }
+    interfaces_data = {host: state.interfaces_data[host] for host in hosts if host in state.interfaces_data}
+    fabric_flows = None
+    # Fabric-wide flows only feed the shutdown check's path index.
+    if any(get_shutdown_ports(host, interfaces_data) for host in interfaces_data):
+        fabric_flows = executor.submit(flow_cache.get, '', fetch_fabric_connection_stats)
+    try:
+        run_checks(
+            report,
+            {host: state.acl_policies[host] for host in hosts if host in state.acl_policies},
+            interfaces_data,
+            {host: state.vlan_configs[host] for host in hosts if host in state.vlan_configs},
+            host_flows,
+            fabric_flows,
+            resolve_jobs(args.jobs),
+            critical_alert(args),
+        )
+    except FindingLimitReached:
+        pass
+    except FetchError as e:
+        print_error(str(e))
+        return
+    enrich_report(report, args)
+    write_report(report, args.format, args.output)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Revalidated {', '.join(hosts) or 'no hosts'} in {elapsed:.0f} ms; watching for changes...", file=sys.stderr)
+
+
+def watch(args, host_vars_dir, structured_config_dir):
+    """Validate every host, then revalidate changed hosts until interrupted."""
+    state = ConfigState(host_vars_dir, structured_config_dir)
+    flow_cache = FlowCache()
+    watcher = make_watcher(state.directories())
+    executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    store = None
+    if args.flow_store:
+        from config_validator.flow_store import FlowStore
+
+        store = FlowStore(args.flow_store, args.flow_window)
+    try:
+        revalidate(args, state, flow_cache, executor, state.load(), store)
+        while True:
+            changed = state.update(watcher.wait())
+            if changed:
+                revalidate(args, state, flow_cache, executor, changed, store)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
+        executor.shutdown(wait=store is not None, cancel_futures=True)
+        if store is not None:
+            store.prune()
+            store.close()
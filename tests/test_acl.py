@@ -0,0 +1,95 @@
+import pytest
+
+from config_validator.acl import MAX_PORT, CompiledAcl, parse_ports
+from config_validator.query_check import warn_skipped_entries
+from config_validator.report import Report
+
+SSH = {'protocol': 6, 'src_ip': '10.0.0.5', 'dst_ip': '10.1.0.9', 'src_port': 50000, 'dst_port': 22}
+
+
+def acl(*entries):
+    return {'name': 'TEST', 'entries': list(entries)}
+
+
+def test_first_permit_wins_over_later_deny():
+    compiled = CompiledAcl(acl(
+        {'sequence': 10, 'action': 'permit', 'protocol': 'tcp', 'source': 'any', 'destination': '10.1.0.0/16'},
+        {'sequence': 20, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': 'any'},
+    ))
+    assert compiled.match(SSH)['action'] == 'permit'
+    assert compiled.match({**SSH, 'dst_ip': '10.2.0.1'})['action'] == 'deny'
+
+
+def test_entry_matches_only_when_every_field_matches():
+    deny = {'sequence': 10, 'action': 'deny', 'protocol': 'tcp', 'source': '10.0.0.0/24',
+            'destination': 'host 10.1.0.9', 'source_ports': 'any', 'destination_ports': ['22']}
+    compiled = CompiledAcl(acl(deny))
+    assert compiled.match(SSH) is deny
+    assert compiled.match({**SSH, 'protocol': 17}) is None
+    assert compiled.match({**SSH, 'src_ip': '10.0.1.5'}) is None
+    assert compiled.match({**SSH, 'dst_ip': '10.1.0.10'}) is None
+    assert compiled.match({**SSH, 'dst_port': 23}) is None
+
+
+def test_entries_are_matched_in_sequence_order():
+    compiled = CompiledAcl(acl(
+        {'sequence': 30, 'action': 'permit', 'protocol': 'ip', 'source': 'any', 'destination': 'any'},
+        {'sequence': 5, 'action': 'deny', 'protocol': 'tcp', 'source': 'any', 'destination': 'any',
+         'destination_ports': ['ssh']},
+    ))
+    assert compiled.match(SSH)['sequence'] == 5
+    assert compiled.match({**SSH, 'dst_port': 80})['sequence'] == 30
+
+
+def test_unparseable_entries_are_listed_not_matched():
+    compiled = CompiledAcl(acl(
+        {'sequence': 10, 'action': 'permit', 'protocol': 'tcp', 'source': 'any', 'destination': 'any',
+         'destination_ports': ['netconf-tls']},
+        {'sequence': 20, 'action': 'permit', 'protocol': 'ip', 'source': 'MGMT-HOSTS', 'destination': 'any'},
+        {'sequence': 'ten', 'action': 'permit', 'protocol': 'ip', 'source': 'any', 'destination': 'any'},
+        {'sequence': 40, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': 'any'},
+    ))
+    assert [entry['sequence'] for entry in compiled.entries] == [40]
+    assert [entry['sequence'] for entry, _ in compiled.skipped] == ['ten', 10, 20]
+    assert 'netconf-tls' in dict((entry['sequence'], reason) for entry, reason in compiled.skipped)[10]
+
+
+def test_skipped_entries_are_reported_as_warnings():
+    policy = acl({'sequence': 10, 'action': 'permit', 'protocol': 'gopher', 'source': 'any', 'destination': 'any'})
+    report = Report()
+    warn_skipped_entries(report, 'leaf1', [policy])
+    warn_skipped_entries(report, 'leaf1', [policy])
+    assert len(report.warnings) == 1
+    assert report.warnings[0]['check'] == 'Acl'
+    assert 'sequence 10' in report.warnings[0]['message']
+    assert 'gopher' in report.warnings[0]['message']
+
+
+@pytest.mark.parametrize('values, operator, intervals', [
+    (['22', 'https'], None, [(22, 22), (443, 443)]),
+    (['1000-2000'], None, [(1000, 2000)]),
+    (['range 1000 2000'], None, [(1000, 2000)]),
+    (['1023'], 'gt', [(1024, MAX_PORT)]),
+    (['lt 1024'], None, [(0, 1023)]),
+    (['80'], 'neq', [(0, 79), (81, MAX_PORT)]),
+    (['lt 0'], None, []),
+    ([str(MAX_PORT)], 'gt', []),
+])
+def test_parse_ports(values, operator, intervals):
+    assert parse_ports(values, operator) == intervals
+
+
+@pytest.mark.parametrize('values, operator', [
+    (['netconf-tls'], None),
+    (['range 1000'], None),
+    (['1000', '2000', '3000'], 'range'),
+    (['range 2000 1000'], None),
+    (['2000-1000'], None),
+    (['gt 10 20'], None),
+    (['eq'], None),
+    (['70000'], None),
+    (['22'], 'between'),
+])
+def test_parse_ports_rejects_malformed_expressions(values, operator):
+    with pytest.raises(ValueError):
+        parse_ports(values, operator)
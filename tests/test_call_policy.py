@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import Future
+
+import grpc
+import pytest
+
+from config_validator.api.call_policy import AimdLimiter, CallPolicy
+from config_validator.api.snapshot import RecordingStub, ReplayStub, Snapshot, request_key
+from pkg.clover import clover_pb2
+
+
+class Error(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+class Method:
+    """A unary RPC that raises the queued errors, then returns `response`."""
+
+    def __init__(self, *errors, response='ok'):
+        self.errors = list(errors)
+        self.response = response
+        self.timeouts = []
+
+    def __call__(self, request, timeout=None):
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise Error(self.errors.pop(0))
+        return self.response
+
+
+def policy(**kwargs):
+    return CallPolicy(**{'deadline': 5.0, 'retries': 3, 'backoff': 0.0, **kwargs})
+
+
+def test_retries_retryable_codes_until_success():
+    method = Method(grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.RESOURCE_EXHAUSTED)
+    assert policy().call(method, None, 'GetConnectionStats') == 'ok'
+    assert len(method.timeouts) == 3
+    assert all(0 < timeout <= 5.0 for timeout in method.timeouts)
+
+
+def test_other_codes_fail_at_once():
+    method = Method(grpc.StatusCode.INVALID_ARGUMENT)
+    with pytest.raises(Error):
+        policy().call(method, None, 'GetConnectionStats')
+    assert len(method.timeouts) == 1
+
+
+def test_retries_are_bounded():
+    method = Method(*[grpc.StatusCode.UNAVAILABLE] * 5)
+    with pytest.raises(Error):
+        policy(retries=2).call(method, None, 'GetConnectionStats')
+    assert len(method.timeouts) == 3
+
+
+def test_limiter_halves_on_throttling_and_grows_slowly():
+    limiter = AimdLimiter(initial=16, cooldown=60)
+    limiter.on_throttle()
+    limiter.on_throttle()  # same burst: ignored
+    assert limiter.limit == 8
+    for _ in range(8):
+        limiter.on_success()
+    assert 8.9 < limiter.limit < 9.1
+
+
+def test_limiter_refuses_hedges_when_full():
+    limiter = AimdLimiter(initial=1)
+    with limiter:
+        assert not limiter.try_acquire()
+    assert limiter.try_acquire()
+
+
+class FutureMethod:
+    """A unary RPC whose first call completes after `first_after` seconds (never if None); later calls at once."""
+
+    def __init__(self, response='hedge', first_after=None):
+        self.response = response
+        self.first_after = first_after
+        self.calls = []
+
+    def __call__(self, request, timeout=None):
+        raise AssertionError("hedged calls go through .future")
+
+    def future(self, request, timeout=None):
+        call = Future()
+        if self.calls:
+            call.set_result(self.response)
+        elif self.first_after is not None:
+            threading.Timer(self.first_after, call.set_result, ('first',)).start()
+        self.calls.append(call)
+        return call
+
+
+def test_slow_calls_are_hedged():
+    method = FutureMethod()
+    assert policy(hedge_after=0.01).call(method, None, 'GetConnectionStats') == 'hedge'
+    assert len(method.calls) == 2
+    assert method.calls[0].cancelled()
+
+
+def test_no_hedge_without_spare_capacity():
+    method = FutureMethod(first_after=0.05)
+    limiter = AimdLimiter(initial=1)
+    assert policy(hedge_after=0.01, limiter=limiter).call(method, None, 'GetConnectionStats') == 'first'
+    assert len(method.calls) == 1
+
+
+class Stub:
+    def __init__(self, method):
+        self.GetConnectionStats = method
+
+
+def test_record_and_replay_stubs_support_hedging():
+    response = clover_pb2.ConnectionStatsResponse(connection_stats=[clover_pb2.ConnectionStats(src_ip='10.0.0.1')])
+    request = clover_pb2.ConnectionStatsRequest(filter=clover_pb2.FlowFilter(device_ids=['SN1']), limit=10)
+    snapshot = Snapshot()
+    recording = RecordingStub(Stub(FutureMethod(response)), snapshot).GetConnectionStats
+    assert hasattr(recording, 'future')
+    assert policy(hedge_after=0.01).call(recording, request, 'GetConnectionStats') == response
+    assert snapshot.get('GetConnectionStats', request_key(request)) == [response.SerializeToString()]
+
+    replay = ReplayStub(snapshot).GetConnectionStats
+    assert hasattr(replay, 'future')
+    assert policy(hedge_after=0.01).call(replay, request, 'GetConnectionStats') == response
+    missing = clover_pb2.ConnectionStatsRequest(filter=clover_pb2.FlowFilter(device_ids=['SN2']))
+    with pytest.raises(grpc.RpcError):
+        policy(hedge_after=0.01).call(replay, missing, 'GetConnectionStats')
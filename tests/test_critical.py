@@ -0,0 +1,85 @@
+from concurrent.futures import Future
+
+import pytest
+
+from config_validator.critical import classify, index_critical, screen_indexed, with_critical
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import run_checks
+from config_validator.report import FindingLimitReached, Report
+
+APP = [{'app_service_name': '00000000-0000-0000-0000-000000000000-bgp-0-0-0-0-0-bgp-svc'}]
+BGP = {'protocol': 6, 'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 50000, 'dst_port': 179,
+       'ingress_interface': 'Ethernet1', 'egress_interface': 'Ethernet2', 'applications': APP}
+BFD = {**BGP, 'protocol': 17, 'dst_port': 3784}
+ICMP = {**BGP, 'protocol': 1, 'src_port': 0, 'dst_port': 0}
+WEB = {**BGP, 'dst_port': 443}
+
+
+@pytest.mark.parametrize('flow, signature', [
+    (BGP, (0, 'BGP')),
+    ({**BGP, 'src_port': 179, 'dst_port': 50000}, (0, 'BGP')),
+    (BFD, (1, 'BFD')),
+    ({**BGP, 'protocol': 89}, (2, 'OSPF')),
+    (ICMP, (3, 'ICMP')),
+    (WEB, None),
+    ({'protocol': '6', 'dst_port': '179'}, (0, 'BGP')),
+    ({'protocol': 17, 'dst_port': 179}, None),
+])
+def test_classify(flow, signature):
+    assert classify(flow) == signature
+
+
+def test_index_is_most_critical_first():
+    assert [name for _, name, _ in index_critical([ICMP, WEB, BFD, BGP])] == ['BGP', 'BFD', 'ICMP']
+
+
+def test_screening_keeps_index_and_flows_in_step():
+    flows = with_critical({'connection_stats': [BGP, WEB, {**ICMP, 'dst_ip': '10.9.9.9'}]})
+    prescreen = build_prescreen([], [], [{'name': 'Vlan10', 'ip_address': '10.0.0.2/24'}])
+    screened = screen_indexed(flows, prescreen)
+    assert screened['connection_stats'] == [BGP, WEB]
+    assert [name for _, name, _ in screened['critical']] == ['BGP']
+
+
+def deny_all():
+    return [{'name': 'EDGE', 'entries': [
+        {'sequence': 10, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': 'any'},
+    ]}]
+
+
+def done(flows):
+    future = Future()
+    future.set_result(flows)
+    return future
+
+
+def test_critical_findings_come_first_and_are_not_repeated():
+    alerts = []
+    report = Report()
+    run_checks(report, {'leaf1': deny_all()}, {}, {}, {'leaf1': done({'connection_stats': [WEB, ICMP, BGP]})},
+               alert=lambda host, findings: alerts.append((host, [finding['critical'] for finding in findings])))
+    assert [finding.get('critical') for finding in report.findings] == ['BGP', 'ICMP', None]
+    assert alerts == [('leaf1', ['BGP', 'ICMP'])]
+
+
+def test_critical_passes_follow_arrival_order():
+    report = Report()
+    late = Future()
+    host_flows = {'leaf1': late, 'leaf2': done({'connection_stats': [BGP]})}
+
+    def alert(host, findings):
+        if host == 'leaf2':
+            late.set_result({'connection_stats': [BFD]})
+
+    run_checks(report, {'leaf1': deny_all(), 'leaf2': deny_all()}, {}, {}, host_flows, alert=alert)
+    assert [(finding['host'], finding['critical']) for finding in report.findings] == [
+        ('leaf2', 'BGP'), ('leaf1', 'BFD'),
+    ]
+
+
+def test_a_critical_finding_at_the_limit_is_still_reported():
+    report = Report(max_findings=1)
+    with pytest.raises(FindingLimitReached):
+        run_checks(report, {'leaf1': deny_all()}, {}, {}, {'leaf1': done({'connection_stats': [WEB, BGP]})})
+    assert report.checked['Acl'] == ['leaf1']
+    assert [finding['critical'] for finding in report.findings] == ['BGP']
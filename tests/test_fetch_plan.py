@@ -0,0 +1,91 @@
+import pytest
+
+from config_validator import fetch_plan
+from config_validator.fetch_plan import DENSE_SAMPLING, PAGE_ORDER, SINGLE_SHOT_MAX, Plan, fetch_planned, probe
+from config_validator.prescreen import build_prescreen
+
+
+def prescreen(destination='10.0.0.0/8'):
+    return build_prescreen([{'name': 'A', 'entries': [
+        {'sequence': 10, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': destination},
+    ]}], [], [])
+
+
+def flow(index):
+    return {'src_ip': '192.0.2.1', 'src_port': index, 'dst_ip': '10.0.0.1' if index % 2 else '192.0.2.9'}
+
+
+@pytest.mark.parametrize('screen, count, sampling, strategy', [
+    (build_prescreen([], [], []), 10 ** 6, 1, 'skip'),
+    (prescreen('host 10.0.0.1'), 10 ** 6, 1, 'filtered'),
+    (prescreen(), None, None, 'single'),
+    (prescreen(), SINGLE_SHOT_MAX, 1, 'single'),
+    (prescreen(), SINGLE_SHOT_MAX + 1, DENSE_SAMPLING, 'tuples'),
+    (prescreen(), SINGLE_SHOT_MAX + 1, DENSE_SAMPLING + 1, 'paginated'),
+    (prescreen(), SINGLE_SHOT_MAX + 1, None, 'paginated'),
+])
+def test_plan_strategy(screen, count, sampling, strategy):
+    assert Plan('leaf1', screen, count, sampling).strategy == strategy
+
+
+def test_probe_reads_count_and_sampling(monkeypatch):
+    responses = {'count': {'count': '42000'}, 'sampling_rate': {'max': {'population': '1000', 'size': '10'}}}
+    monkeypatch.setattr(fetch_plan, '_get', lambda host, route, params=None: responses[route])
+    assert probe('leaf1') == (42000, 100)
+
+
+def test_probe_failure_leaves_the_plan_unknown(monkeypatch):
+    def fail(host, route, params=None):
+        raise ConnectionError(route)
+
+    monkeypatch.setattr(fetch_plan, '_get', fail)
+    assert probe('leaf1') == (None, None)
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    monkeypatch.setattr(fetch_plan, 'PAGE_SIZE', 10)
+    calls = []
+
+    def fetch(host, include=None, start=None, end=None, mode='connections', limit=None, offset=0, sort_by=None):
+        calls.append({'start': start, 'end': end, 'limit': limit, 'offset': offset, 'sort_by': sort_by})
+        return {'connection_stats': [flow(index) for index in range(offset, min(offset + limit, 25))]}
+
+    monkeypatch.setattr(fetch_plan, 'fetch_connection_stats', fetch)
+    return calls
+
+
+def test_paginated_fetch_pages_one_window_in_a_stable_order(pages):
+    result = fetch_planned(Plan('leaf1', prescreen(), 10 ** 6, 1000))
+    assert [call['offset'] for call in pages] == [0, 10, 20]
+    assert len({(call['start'], call['end']) for call in pages}) == 1
+    assert all(call['sort_by'] == PAGE_ORDER and call['limit'] == 10 for call in pages)
+    # Only the flows the prescreen keeps, odd indices here, are held.
+    assert result['connection_stats'] == [flow(index) for index in range(1, 25, 2)]
+
+
+def test_paginated_fetch_stops_when_the_offset_is_ignored(monkeypatch):
+    monkeypatch.setattr(fetch_plan, 'PAGE_SIZE', 10)
+    calls = []
+
+    def fetch(host, **kwargs):
+        calls.append(kwargs['offset'])
+        return {'connection_stats': [flow(index) for index in range(10)]}
+
+    monkeypatch.setattr(fetch_plan, 'fetch_connection_stats', fetch)
+    result = fetch_planned(Plan('leaf1', prescreen(), 10 ** 6, 1000))
+    assert calls == [0, 10]
+    assert len(result['connection_stats']) == 5
+
+
+def test_filtered_fetch_sends_the_prescreen_criteria(monkeypatch):
+    calls = []
+
+    def fetch(host, include=None, **kwargs):
+        calls.append(include)
+        return {'connection_stats': [{'dst_ip': '10.0.0.1'}, {'dst_ip': '10.0.0.2'}]}
+
+    monkeypatch.setattr(fetch_plan, 'fetch_connection_stats', fetch)
+    result = fetch_planned(Plan('leaf1', prescreen('host 10.0.0.1'), 10 ** 6, 1))
+    assert calls == [{'dst_ips': ['10.0.0.1']}]
+    assert result['connection_stats'] == [{'dst_ip': '10.0.0.1'}]
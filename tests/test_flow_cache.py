@@ -0,0 +1,44 @@
+import threading
+import time
+
+from config_validator import flow_cache
+from config_validator.flow_cache import FlowCache
+
+
+def test_entries_are_reused_until_they_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(flow_cache.time, 'monotonic', lambda: now[0])
+    cache = FlowCache(ttl=60)
+    fetches = []
+
+    def fetch():
+        fetches.append(now[0])
+        return {'connection_stats': [len(fetches)]}
+
+    assert cache.get('leaf1', fetch) == {'connection_stats': [1]}
+    now[0] += 60
+    assert cache.get('leaf1', fetch) == {'connection_stats': [1]}
+    assert cache.get('leaf2', fetch) == {'connection_stats': [2]}
+    now[0] += 1
+    assert cache.get('leaf1', fetch) == {'connection_stats': [3]}
+    assert fetches == [100.0, 160.0, 161.0]
+
+
+def test_concurrent_lookups_share_one_fetch():
+    cache = FlowCache()
+    started = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return {'connection_stats': []}
+
+    threads = [threading.Thread(target=cache.get, args=('leaf1', fetch)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert started.is_set()
+    assert len(calls) == 1
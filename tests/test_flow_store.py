@@ -0,0 +1,90 @@
+import pytest
+
+from config_validator import flow_store
+from config_validator.flow_store import PULL_WINDOW, FlowStore
+from config_validator.prescreen import build_prescreen
+
+SSH = {'src_ip': '10.0.0.1', 'dst_ip': '10.0.0.2', 'src_port': 40000, 'dst_port': 22, 'protocol': 6,
+       'ingress_interface': 'Ethernet1', 'egress_interface': 'Ethernet2', 'bytes': '100', 'packets': '2'}
+DNS = {'src_ip': '10.0.0.3', 'dst_ip': '10.0.0.53', 'src_port': 50000, 'dst_port': 53, 'protocol': 17,
+       'ingress_interface': 'Ethernet3', 'egress_interface': 'Ethernet4', 'bytes': '60', 'packets': '1'}
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(10_000_000_000)
+    monkeypatch.setattr(flow_store, 'now_ms', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = FlowStore(str(tmp_path / 'flows.db'), window=3600)
+    yield store
+    store.close()
+
+
+def deny_to(address):
+    return build_prescreen([{'name': 'A', 'entries': [
+        {'sequence': 10, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': f'host {address}'},
+    ]}], [], [])
+
+
+def test_repeat_sightings_are_merged(store, clock):
+    store.pull('d1', lambda start, end: {'connection_stats': [SSH, DNS]})
+    clock.now += PULL_WINDOW * 1000
+    store.pull('d1', lambda start, end: {'connection_stats': [SSH]})
+    [flow] = store.flows('d1', deny_to('10.0.0.2'))['connection_stats']
+    assert (flow['bytes'], flow['packets']) == (200, 4)
+    assert store.flows('d2', deny_to('10.0.0.2'))['connection_stats'] == []
+
+
+def test_pulls_continue_from_the_last_one(store, clock):
+    windows = []
+
+    def fetch(start, end):
+        windows.append((start, end))
+        return {}
+
+    store.pull('d1', fetch)
+    clock.now += 60_000
+    store.pull('d1', fetch)
+    assert windows == [(clock.now - 60_000 - PULL_WINDOW * 1000, clock.now - 60_000), (clock.now - 60_000, clock.now)]
+
+
+def test_catch_up_is_split_into_windows(store, clock):
+    windows = []
+    store.pull('d1', lambda start, end: windows.append((start, end)))
+    windows.clear()
+    clock.now += 7200 * 1000
+    store.pull('d1', lambda start, end: windows.append((start, end)))
+    # Capped at the store's one-hour window, fetched five minutes at a time.
+    assert windows[0][0] == clock.now - 3600 * 1000
+    assert windows[-1][1] == clock.now
+    assert all(end - start <= PULL_WINDOW * 1000 for start, end in windows)
+    assert all(windows[i][1] == windows[i + 1][0] for i in range(len(windows) - 1))
+    assert store.last_pull('d1') == clock.now
+
+
+def test_flows_outside_the_window_are_ignored_and_pruned(store, clock):
+    store.pull('d1', lambda start, end: {'connection_stats': [SSH]})
+    clock.now += 3601 * 1000
+    assert store.flows('d1', deny_to('10.0.0.2'))['connection_stats'] == []
+    assert store.prune() == 1
+
+
+def test_range_keys_fall_back_to_screening_the_device(store):
+    store.pull('d1', lambda start, end: {'connection_stats': [SSH, DNS]})
+    prescreen = build_prescreen([{'name': 'A', 'entries': [
+        {'sequence': 10, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': '10.0.0.0/30'},
+    ]}], [], [])
+    assert prescreen.index_keys() is None
+    assert [flow['dst_ip'] for flow in store.flows('d1', prescreen)['connection_stats']] == ['10.0.0.2']
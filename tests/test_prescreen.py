@@ -0,0 +1,73 @@
+from config_validator import synthetic
+from config_validator.prescreen import build_prescreen
+from config_validator.query_check import (
+    get_shutdown_ports, iter_blocked_flows, iter_shutdown_affected, iter_vlan_impacts,
+)
+
+
+def deny(**fields):
+    entry = {'sequence': 10, 'action': 'deny', 'protocol': 'ip', 'source': 'any', 'destination': 'any', **fields}
+    return {'name': 'TEST', 'entries': [entry]}
+
+
+def test_screen_keeps_every_impacted_flow():
+    flows = {'connection_stats': synthetic.generate_flows(3000, seed=1)}
+    acls = synthetic.generate_acls(200, seed=1)
+    # Drop catch-all denies, which would turn the screen off entirely.
+    for acl in acls:
+        acl['entries'] = [entry for entry in acl['entries']
+                          if entry['source'] != 'any' or entry['destination'] != 'any' or 'destination_ports' in entry]
+    interfaces = {'h': synthetic.generate_interfaces(48, seed=1)}
+    svis = synthetic.generate_svis(8, seed=1)
+    shutdown_ports = get_shutdown_ports('h', interfaces)
+    prescreen = build_prescreen(acls, shutdown_ports, svis)
+
+    impacted = {id(flow) for _, _, flow, _, _ in iter_blocked_flows(acls, flows)}
+    impacted |= {id(flow) for flow, _ in iter_shutdown_affected('h', shutdown_ports, flows)}
+    impacted |= {id(impact['flow']) for impact in iter_vlan_impacts(svis, flows)}
+    kept = {id(flow) for flow in flows['connection_stats'] if prescreen.may_match(flow)}
+    assert impacted
+    assert impacted <= kept
+    assert len(kept) < len(flows['connection_stats'])
+
+
+def test_permits_contribute_no_keys():
+    assert build_prescreen([deny(action='permit')], [], []).empty
+
+
+def test_single_host_denies_become_a_server_side_filter():
+    acls = [deny(destination='host 10.0.0.1'), deny(destination='10.0.0.2/32', sequence=20)]
+    prescreen = build_prescreen(acls, [], [])
+    assert prescreen.include_criteria() == {'dst_ips': ['10.0.0.1', '10.0.0.2']}
+    assert prescreen.index_keys() == [('dst_ip', {'10.0.0.1', '10.0.0.2'})]
+    assert prescreen.may_match({'dst_ip': '10.0.0.1'})
+    assert not prescreen.may_match({'dst_ip': '10.0.0.3'})
+
+
+def test_mixed_fields_have_no_single_filter():
+    prescreen = build_prescreen([deny(destination='host 10.0.0.1')], ['Ethernet1'], [])
+    assert prescreen.include_criteria() is None
+    assert sorted(column for column, _ in prescreen.index_keys()) == ['dst_ip', 'egress_interface', 'ingress_interface']
+
+
+def test_prefixes_and_wide_ranges_have_no_index_keys():
+    assert build_prescreen([deny(destination='10.1.0.0/16')], [], []).index_keys() is None
+    wide = build_prescreen([deny(protocol='tcp', destination_ports=['gt 1023'])], [], [])
+    assert wide.include_criteria() == {'protocols': [6]}
+    assert wide.may_match({'protocol': 6, 'dst_port': 80})
+    assert not wide.may_match({'protocol': 17, 'dst_port': 5000})
+
+
+def test_catch_all_deny_matches_everything():
+    prescreen = build_prescreen([deny()], [], [])
+    assert prescreen.match_all
+    assert prescreen.index_keys() is None
+    assert prescreen.may_match({'src_ip': '192.0.2.1', 'protocol': 47})
+
+
+def test_svi_addresses_match_either_direction():
+    prescreen = build_prescreen([], [], [{'name': 'Vlan10', 'ip_address': '10.9.9.1/24'}])
+    assert prescreen.may_match({'src_ip': '10.9.9.1'})
+    assert prescreen.may_match({'dst_ip': '10.9.9.1'})
+    assert not prescreen.may_match({'src_ip': '10.9.9.2'})
+    assert prescreen.include_criteria() is None
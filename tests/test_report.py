@@ -0,0 +1,72 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from config_validator.report import WRITERS, FindingLimitReached, Report, acl_finding, decode_app_name
+
+APP = '00000000-0000-0000-0000-000000000000-web-0-0-0-0-0-web-svc'
+FLOW = {'src_ip': '10.0.0.1', 'src_port': 40000, 'dst_ip': '10.0.0.2', 'dst_port': 443, 'protocol': 6,
+        'ingress_interface': 'Ethernet1', 'egress_interface': 'Ethernet2', 'bytes': '100', 'packets': '2'}
+ACL = {'name': 'EDGE'}
+ENTRY = {'sequence': 20, 'action': 'deny', 'destination_ports': ['https']}
+
+
+def report_with_finding(**kwargs):
+    report = Report(**kwargs)
+    report.host_checked('Acl', 'leaf1')
+    report.host_checked('Acl', 'leaf2')
+    report.add(acl_finding('leaf1', ACL, ENTRY, FLOW, 'TCP', APP))
+    return report
+
+
+def written(report, output_format):
+    stream = io.StringIO()
+    WRITERS[output_format](report, stream)
+    return stream.getvalue()
+
+
+def test_decode_app_name():
+    assert decode_app_name(APP) == 'web:web-svc'
+
+
+def test_jsonl_has_one_line_per_finding():
+    lines = written(report_with_finding(), 'jsonl').splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert (record['check'], record['host'], record['sequence']) == ('Acl', 'leaf1', 20)
+    assert record['app_name'] == 'web:web-svc'
+
+
+def test_junit_fails_only_hosts_with_findings():
+    suites = ET.fromstring(written(report_with_finding(), 'junit'))
+    acl = suites.find("testsuite[@name='Acl']")
+    assert (acl.get('tests'), acl.get('failures')) == ('2', '1')
+    assert acl.find("testcase[@name='leaf1']/failure") is not None
+    assert acl.find("testcase[@name='leaf2']/failure") is None
+
+
+def test_sarif_results_are_errors_and_warnings_are_warnings():
+    report = report_with_finding()
+    report.warn('Acl', 'leaf2', 'ACL "EDGE" sequence 30 could not be parsed')
+    results = json.loads(written(report, 'sarif'))['runs'][0]['results']
+    assert [(result['ruleId'], result['level']) for result in results] == [('Acl', 'error'), ('Acl', 'warning')]
+
+
+def test_max_findings_stops_and_marks_the_report_truncated():
+    report = Report(max_findings=2)
+    report.add(acl_finding('leaf1', ACL, ENTRY, FLOW, 'TCP', APP))
+    with pytest.raises(FindingLimitReached):
+        report.add(acl_finding('leaf1', ACL, ENTRY, FLOW, 'TCP', APP))
+    assert report.truncated
+    assert report.count == 2
+
+
+def test_top_keeps_aggregated_groups():
+    report = Report(top=1)
+    report.add(acl_finding('leaf1', ACL, ENTRY, FLOW, 'TCP', APP))
+    report.add(acl_finding('leaf1', ACL, ENTRY, {**FLOW, 'bytes': '50'}, 'TCP', APP))
+    [group] = report.results()
+    assert (group['flows'], group['bytes']) == (2, 150)
+    assert report.conflicts() == ['Acl']
@@ -0,0 +1,46 @@
+import gzip
+
+import pytest
+
+from config_validator.api.snapshot import ReplayStub, Snapshot, SnapshotMiss, request_key
+from pkg.clover import clover_pb2
+
+
+def stats_request(device='SN1', start=0, **kwargs):
+    return clover_pb2.ConnectionStatsRequest(
+        filter=clover_pb2.FlowFilter(device_ids=[device], start=start, end=start + 300), **kwargs,
+    )
+
+
+def test_keys_ignore_the_window_but_not_the_rest_of_the_request():
+    assert request_key(stats_request(start=1000)) == request_key(stats_request(start=5000))
+    assert request_key(stats_request()).startswith('SN1#')
+    assert request_key(stats_request()) != request_key(stats_request(device='SN2'))
+    assert request_key(stats_request()) != request_key(stats_request(limit=10))
+    filtered = stats_request()
+    filtered.filter.include.dst_ports.append(22)
+    assert request_key(stats_request()) != request_key(filtered)
+
+
+def test_round_trip(tmp_path):
+    response = clover_pb2.ConnectionStatsResponse(connection_stats=[clover_pb2.ConnectionStats(src_ip='10.0.0.1')])
+    snapshot = Snapshot()
+    snapshot.inventory = [{'hostname': 'leaf1', 'serial_number': 'SN1'}]
+    snapshot.put('GetConnectionStats', request_key(stats_request()), [response.SerializeToString()])
+    path = str(tmp_path / 'snap.bin')
+    snapshot.save(path)
+
+    loaded = Snapshot.load(path)
+    assert loaded.inventory == snapshot.inventory
+    stub = ReplayStub(loaded)
+    assert stub.GetConnectionStats(stats_request(start=99999)) == response
+    with pytest.raises(SnapshotMiss, match='SN2'):
+        stub.GetConnectionStats(stats_request(device='SN2'))
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'other.bin'
+    with gzip.open(path, 'wb') as f:
+        f.write(b'not a snapshot')
+    with pytest.raises(ValueError, match='not a config_validator snapshot'):
+        Snapshot.load(str(path))